@@ -1,18 +1,40 @@
 from django.contrib import admin
+from django.contrib.admin.models import CHANGE, LogEntry
+from django.contrib.admin.options import get_content_type_for_model
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
 from django.utils.html import format_html
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.urls import path
 from django.shortcuts import render
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.utils import timezone
 import csv
+import logging
 from .models import *
+from .caching import invalidate_dashboards
+from .statistics import update_applications, update_payments
+from .pdf import stream_application_pdfs_zip
+
+logger = logging.getLogger(__name__)
 
 # Customize Admin Site
 admin.site.site_header = "CHSTH Admission Portal"
 admin.site.site_title = "CHSTH Admin"
 admin.site.index_title = "College of Health Sciences and Technology Hadejia"
 
+def log_bulk_change(request, model, count, message):
+    """Record a bulk action in the admin log as one entry for all `count` rows, not one per row"""
+    LogEntry.objects.log_action(
+        user_id=request.user.pk,
+        content_type_id=get_content_type_for_model(model).pk,
+        object_id=None,
+        object_repr=f'{count} {model._meta.verbose_name if count == 1 else model._meta.verbose_name_plural}',
+        action_flag=CHANGE,
+        change_message=message,
+    )
+
 class StudentInline(admin.StackedInline):
     model = Student
     can_delete = False
@@ -21,6 +43,7 @@ class StudentInline(admin.StackedInline):
 class UserAdmin(BaseUserAdmin):
     inlines = (StudentInline,)
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'get_phone', 'get_payment_status')
+    list_select_related = ('student',)
     
     def get_phone(self, obj):
         try:
@@ -33,7 +56,7 @@ class UserAdmin(BaseUserAdmin):
         try:
             if obj.student.has_paid:
                 return format_html('<span style="color: green;">Paid</span>')
-            elif obj.student.referral_code:
+            elif obj.student.referral_code_id:
                 return format_html('<span style="color: blue;">Referral Used</span>')
             else:
                 return format_html('<span style="color: red;">Unpaid</span>')
@@ -60,6 +83,7 @@ class StudentAdmin(admin.ModelAdmin):
     list_filter = ('has_paid', 'can_apply', 'created_at')
     search_fields = ('user__username', 'user__email', 'user__first_name', 'user__last_name', 'phone')
     readonly_fields = ('created_at',)
+    list_select_related = ('user', 'referral_code')
     
     def get_full_name(self, obj):
         return obj.user.get_full_name() or obj.user.username
@@ -79,30 +103,34 @@ class PaymentAdmin(admin.ModelAdmin):
     list_filter = ('status', 'created_at')
     search_fields = ('reference', 'student__user__username', 'student__user__email')
     readonly_fields = ('created_at', 'updated_at')
+    list_select_related = ('student__user',)
     
     actions = ['mark_as_successful', 'mark_as_failed']
     
     def mark_as_successful(self, request, queryset):
-        """Mark selected payments as successful and update student status"""
-        updated = 0
-        for payment in queryset:
-            if payment.status != 'success':
-                payment.status = 'success'
-                payment.save()
-                
-                # Update student status
-                student = payment.student
-                student.has_paid = True
-                student.can_apply = True
-                student.save()
-                updated += 1
+        """Mark selected payments as successful and grant their students access, in two UPDATEs"""
+        with transaction.atomic():
+            payments = queryset.exclude(status='success')
+            # Bulk updates send no post_save, so drop the dashboards here, before the UPDATEs change the selection
+            invalidate_dashboards(user_ids=payments.values_list('student__user_id', flat=True))
+            granted = Student.objects.filter(pk__in=payments.values('student_id')).exclude(
+                has_paid=True, can_apply=True
+            ).update(has_paid=True, can_apply=True)
+            updated = update_payments(payments, status='success', updated_at=timezone.now())
+            if updated:
+                log_bulk_change(request, Payment, updated, f"Marked as successful; {granted} students granted access.")
         
-        self.message_user(request, f"{updated} payments marked as successful and student access granted.")
+        self.message_user(request, f"{updated} payments marked as successful and {granted} students granted access.")
     mark_as_successful.short_description = "Mark selected payments as successful"
     
     def mark_as_failed(self, request, queryset):
         """Mark selected payments as failed"""
-        updated = queryset.update(status='failed')
+        with transaction.atomic():
+            payments = queryset.exclude(status='failed')
+            invalidate_dashboards(user_ids=payments.values_list('student__user_id', flat=True))
+            updated = update_payments(payments, status='failed', updated_at=timezone.now())
+            if updated:
+                log_bulk_change(request, Payment, updated, "Marked as failed.")
         self.message_user(request, f"{updated} payments marked as failed.")
     mark_as_failed.short_description = "Mark selected payments as failed"
     
@@ -110,6 +138,37 @@ class PaymentAdmin(admin.ModelAdmin):
         return obj.student.user.get_full_name()
     get_student_name.short_description = 'Student'
 
+class Echo:
+    """File-like object that hands back what is written, for streaming CSV"""
+    def write(self, value):
+        return value
+
+SSCE_CSV_COLUMNS = ['Exam Type', 'Exam Number', 'Registration Number', 'Centre', 'Year', 'Grades']
+
+SSCE_GRADE_FIELDS = [
+    ('English', 'english_grade'),
+    ('Mathematics', 'mathematics_grade'),
+    ('Biology', 'biology_grade'),
+    ('Chemistry', 'chemistry_grade'),
+    ('Physics', 'physics_grade'),
+]
+
+def ssce_csv_values(result):
+    """CSV cells for one SSCE sitting, blank if the sitting wasn't entered"""
+    if result is None:
+        return [''] * len(SSCE_CSV_COLUMNS)
+    grades = [f'{subject}: {getattr(result, field)}' for subject, field in SSCE_GRADE_FIELDS]
+    for n in range(1, 5):
+        grades.append(f"{getattr(result, f'subject_{n}')}: {getattr(result, f'subject_{n}_grade')}")
+    return [
+        result.get_exam_type_display(),
+        result.exam_number,
+        result.registration_number,
+        f'{result.centre_name} ({result.centre_number})',
+        result.year,
+        '; '.join(grades),
+    ]
+
 class SchoolAttendedInline(admin.TabularInline):
     model = SchoolAttended
     extra = 0
@@ -131,6 +190,7 @@ class ApplicationAdmin(admin.ModelAdmin):
     search_fields = ('application_number', 'student__user__username', 'student__user__email', 'first_name', 'surname')
     readonly_fields = ('application_number', 'created_at', 'updated_at', 'submitted_at')
     inlines = [SchoolAttendedInline, SSCEResultInline, UploadedDocumentInline]
+    list_select_related = ('student__user',)
     
     fieldsets = (
         ('Application Info', {
@@ -159,20 +219,42 @@ class ApplicationAdmin(admin.ModelAdmin):
         return obj.student.user.get_full_name()
     get_student_name.short_description = 'Student'
     
-    actions = ['export_to_csv', 'approve_applications', 'reject_applications']
+    actions = ['export_to_csv', 'export_to_csv_detailed', 'export_pdfs_zip', 'approve_applications', 'reject_applications']
     
     def export_to_csv(self, request, queryset):
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="applications.csv"'
+        return self._stream_csv(queryset, detailed=False)
+    export_to_csv.short_description = "Export selected applications to CSV"
+    
+    def export_to_csv_detailed(self, request, queryset):
+        return self._stream_csv(queryset, detailed=True)
+    export_to_csv_detailed.short_description = "Export selected applications to CSV (with schools, SSCE and documents)"
+    
+    def _stream_csv(self, queryset, detailed):
+        """Stream the CSV row by row; related rows are fetched per chunk, not per application"""
+        queryset = queryset.select_related('student__user').order_by('pk')
+        if detailed:
+            queryset = queryset.prefetch_related('schools_attended', 'ssce_results', 'documents')
         
-        writer = csv.writer(response)
-        writer.writerow([
+        writer = csv.writer(Echo())
+        rows = (writer.writerow(row) for row in self._csv_rows(queryset.iterator(chunk_size=500), detailed))
+        response = StreamingHttpResponse(rows, content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="applications.csv"'
+        return response
+    
+    def _csv_rows(self, applications, detailed):
+        header = [
             'Application Number', 'Student Name', 'Email', 'Phone', 'First Choice', 
             'Second Choice', 'Status', 'Date Submitted'
-        ])
+        ]
+        if detailed:
+            header += ['Schools Attended']
+            for sitting in (1, 2):
+                header += [f'Sitting {sitting} {column}' for column in SSCE_CSV_COLUMNS]
+            header += ['Uploaded Documents']
+        yield header
         
-        for application in queryset:
-            writer.writerow([
+        for application in applications:
+            row = [
                 application.application_number,
                 application.student.user.get_full_name(),
                 application.student.user.email,
@@ -181,17 +263,129 @@ class ApplicationAdmin(admin.ModelAdmin):
                 application.get_second_choice_display(),
                 application.get_status_display(),
                 application.submitted_at
-            ])
+            ]
+            if detailed:
+                row.append('; '.join(str(school) for school in application.schools_attended.all()))
+                sittings = {result.sitting_number: result for result in application.ssce_results.all()}
+                for sitting in (1, 2):
+                    row += ssce_csv_values(sittings.get(sitting))
+                row.append('; '.join(doc.get_document_type_display() for doc in application.documents.all()))
+            yield row
+    
+    def export_pdfs_zip(self, request, queryset):
+        """Stream the selected applications' PDFs as a ZIP, rendered in parallel"""
+        def progress(count):
+            if count % 100 == 0:
+                logger.info("Bulk PDF export for %s: %d PDFs rendered", request.user, count)
         
+        response = StreamingHttpResponse(
+            stream_application_pdfs_zip(queryset.order_by('pk').iterator(chunk_size=500), progress=progress),
+            content_type='application/zip'
+        )
+        response['Content-Disposition'] = 'attachment; filename="application_pdfs.zip"'
         return response
-    export_to_csv.short_description = "Export selected applications to CSV"
+    export_pdfs_zip.short_description = "Download selected application PDFs as ZIP"
+    
+    def _set_status(self, request, queryset, status):
+        """Give the selected applications `status` in one UPDATE; returns (updated, already in that status)"""
+        with transaction.atomic():
+            selected = queryset.count()
+            applications = queryset.exclude(status=status)
+            # Before the UPDATE takes the applications out of the selection
+            invalidate_dashboards(user_ids=applications.values_list('student__user_id', flat=True))
+            updated = update_applications(applications, status=status, updated_at=timezone.now())
+            if updated:
+                log_bulk_change(request, Application, updated, f"Changed status to {status}.")
+        return updated, selected - updated
     
     def approve_applications(self, request, queryset):
-        queryset.update(status='approved')
-        self.message_user(request, f"{queryset.count()} applications approved.")
+        updated, unchanged = self._set_status(request, queryset, 'approved')
+        self.message_user(request, f"{updated} applications approved." + (f" {unchanged} were already approved." if unchanged else ""))
     approve_applications.short_description = "Approve selected applications"
     
     def reject_applications(self, request, queryset):
-        queryset.update(status='rejected')
-        self.message_user(request, f"{queryset.count()} applications rejected.")
-    reject_applications.short_description = "Reject selected applications"
\ No newline at end of file
+        updated, unchanged = self._set_status(request, queryset, 'rejected')
+        self.message_user(request, f"{updated} applications rejected." + (f" {unchanged} were already rejected." if unchanged else ""))
+    reject_applications.short_description = "Reject selected applications"
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'key', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('key',)
+    readonly_fields = ('created_at', 'updated_at')
+
+@admin.register(PaystackEvent)
+class PaystackEventAdmin(admin.ModelAdmin):
+    list_display = ('event', 'reference', 'received_at', 'processed_at')
+    list_filter = ('event', 'processed_at')
+    search_fields = ('reference',)
+    readonly_fields = ('event_id', 'event', 'reference', 'payload', 'received_at', 'processed_at')
+@admin.register(StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'references', 'updated_at')
+    search_fields = ('name',)
+    readonly_fields = ('name', 'size', 'references', 'created_at', 'updated_at')
+
+@admin.register(AdmissionStatistic)
+class AdmissionStatisticAdmin(admin.ModelAdmin):
+    """Charts of the incrementally maintained statistics instead of a changelist"""
+    REVENUE_DAYS = 30
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        rows = {}
+        for statistic in AdmissionStatistic.objects.filter(count__gt=0):
+            rows.setdefault(statistic.metric, []).append(statistic)
+
+        labels = {
+            'first_choice': dict(Application.COURSE_CHOICES),
+            'second_choice': dict(Application.COURSE_CHOICES),
+            'application_status': dict(Application.STATUS_CHOICES),
+            'submission': {'submitted': 'Submitted', 'draft': 'Draft'},
+            'payment_status': dict(Payment.PAYMENT_STATUS),
+        }
+        charts = []
+        for metric, title in AdmissionStatistic.METRIC_CHOICES:
+            statistics = rows.get(metric, [])
+            if metric == 'revenue':
+                statistics = sorted(statistics, key=lambda s: s.key)[-self.REVENUE_DAYS:]
+                bars = [(s.key, s.count, s.amount) for s in statistics]
+                title = f"{title} (last {self.REVENUE_DAYS} days)"
+            else:
+                names = labels[metric]
+                bars = sorted(
+                    ((names.get(s.key, s.key), s.count, s.amount) for s in statistics),
+                    key=lambda bar: -bar[1],
+                )
+            # Revenue bars scale by naira, everything else by count
+            scale = max((bar[2] if metric == 'revenue' else bar[1] for bar in bars), default=0) or 1
+            charts.append({
+                'metric': metric,
+                'title': title,
+                'show_amount': metric in ('payment_status', 'revenue'),
+                'bars': [
+                    {'label': label, 'count': count, 'amount': amount,
+                     'width': round(100 * (amount if metric == 'revenue' else count) / scale)}
+                    for label, count, amount in bars
+                ],
+            })
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Admission Statistics',
+            'opts': self.model._meta,
+            'charts': charts,
+            **(extra_context or {}),
+        }
+        return render(request, 'admin/admission/statistics.html', context)
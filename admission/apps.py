@@ -2,4 +2,8 @@ from django.apps import AppConfig
 
 class AdmissionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'admission'
\ No newline at end of file
+    name = 'admission'
+
+    def ready(self):
+        # Register background job handlers, signal receivers and system checks
+        from . import checks, images, payments, signals  # noqa: F401
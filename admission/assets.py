@@ -0,0 +1,334 @@
+"""
+Self-hosted front-end assets.
+
+Bootstrap, Font Awesome and the Poppins font are vendored under
+static/vendor/ from pinned releases, each file checked against the
+SHA-384 recorded in static/vendor/vendor.lock.json when it was first
+fetched. The stylesheets are then purged of rules for classes no template,
+script or form ever uses and written out as a single static/css/vendor.css,
+which collectstatic fingerprints and precompresses like any other file,
+alongside static/css/fonts.css with the Poppins @font-face rules.
+
+base.html links only these files. The `admission.E001` system check fails
+`check` and `collectstatic` while any of them is missing (it is a warning
+when REQUIRE_BUILT_ASSETS is off, as in development), so a deployment can
+never serve pages whose styles don't exist.
+"""
+import base64
+import hashlib
+import json
+import os
+import posixpath
+import re
+import urllib.request
+
+from django.apps import apps
+from django.conf import settings
+
+BOOTSTRAP = 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist'
+FONT_AWESOME = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0'
+POPPINS = 'https://cdn.jsdelivr.net/npm/@fontsource/poppins@5.0.8/files'
+POPPINS_WEIGHTS = (300, 400, 500, 600, 700)
+
+VENDOR_FILES = {
+    'bootstrap/css/bootstrap.min.css': f'{BOOTSTRAP}/css/bootstrap.min.css',
+    'bootstrap/js/bootstrap.bundle.min.js': f'{BOOTSTRAP}/js/bootstrap.bundle.min.js',
+    'fontawesome/css/all.min.css': f'{FONT_AWESOME}/css/all.min.css',
+    **{
+        f'fontawesome/webfonts/{font}.{ext}': f'{FONT_AWESOME}/webfonts/{font}.{ext}'
+        for font in ('fa-brands-400', 'fa-regular-400', 'fa-solid-900', 'fa-v4compatibility')
+        for ext in ('woff2', 'ttf')
+    },
+    **{
+        f'poppins/poppins-latin-{weight}-normal.woff2': f'{POPPINS}/poppins-latin-{weight}-normal.woff2'
+        for weight in POPPINS_WEIGHTS
+    },
+}
+
+# Stylesheets bundled (after purging) into static/css/vendor.css, in order
+BUNDLED_STYLESHEETS = ['bootstrap/css/bootstrap.min.css', 'fontawesome/css/all.min.css']
+BUNDLE_NAME = 'css/vendor.css'
+FONTS_NAME = 'css/fonts.css'
+# What base.html links when the assets are self-hosted
+BUILD_OUTPUTS = (BUNDLE_NAME, FONTS_NAME, 'vendor/bootstrap/js/bootstrap.bundle.min.js') + tuple(
+    f'vendor/poppins/poppins-latin-{weight}-normal.woff2' for weight in POPPINS_WEIGHTS
+)
+
+# Classes built inside template tags, which the token scan can't see whole
+SAFELIST = {
+    'alert-success', 'alert-info', 'alert-warning', 'alert-danger', 'alert-error', 'alert-debug',
+    'fa-exclamation-triangle', 'fa-check-circle', 'fa-info-circle',
+}
+
+# Manifest storage would insist on the referenced .map files existing
+SOURCE_MAP_RE = re.compile(rb'\n?(?:/\*# sourceMappingURL=[^*]*\*/|//# sourceMappingURL=\S*)\s*$')
+TOKEN_RE = re.compile(r'-?[A-Za-z_][\w-]*')
+CLASS_RE = re.compile(r'\.(-?[A-Za-z_][\w-]*)')
+NESTED_RE = re.compile(r'\([^()]*\)|\[[^\]]*\]')
+URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+AT_RULE_RE = re.compile(r'@[\w-]+')
+# At-rules whose blocks hold rules (filtered) rather than declarations
+GROUPING_AT_RULES = {'@media', '@supports', '@layer', '@container'}
+
+
+def static_dir():
+    return settings.STATICFILES_DIRS[0]
+
+
+def missing_outputs():
+    """The files base.html links that build_assets hasn't written"""
+    return [name for name in BUILD_OUTPUTS if not os.path.isfile(os.path.join(static_dir(), name))]
+
+
+def vendor_dir():
+    return os.path.join(static_dir(), 'vendor')
+
+
+def _lock_path():
+    return os.path.join(vendor_dir(), 'vendor.lock.json')
+
+
+def _sri(content):
+    return 'sha384-' + base64.b64encode(hashlib.sha384(content).digest()).decode()
+
+
+def fetch_vendor_files(update=False, log=lambda message: None):
+    """
+    Download missing vendored files (or all of them with `update`),
+    verifying each against the lock file; returns the number fetched.
+    """
+    try:
+        with open(_lock_path()) as lock_file:
+            lock = json.load(lock_file)
+    except FileNotFoundError:
+        lock = {}
+
+    fetched = 0
+    for path, url in VENDOR_FILES.items():
+        target = os.path.join(vendor_dir(), path)
+        locked = lock.get(path)
+        if locked and locked['url'] != url:
+            locked = None
+        if os.path.exists(target) and locked and not update:
+            continue
+
+        with urllib.request.urlopen(url, timeout=30) as response:
+            content = SOURCE_MAP_RE.sub(b'\n', response.read())
+        integrity = _sri(content)
+        if locked and not update and locked['integrity'] != integrity:
+            raise ValueError(f'{url} does not match {locked["integrity"]} in {_lock_path()}')
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as destination:
+            destination.write(content)
+        lock[path] = {'url': url, 'integrity': integrity}
+        fetched += 1
+        log(f'Fetched {path} ({len(content):,} bytes)')
+
+    with open(_lock_path(), 'w') as lock_file:
+        json.dump(dict(sorted(lock.items())), lock_file, indent=2)
+        lock_file.write('\n')
+    return fetched
+
+
+def _source_files():
+    """Templates, Python modules and scripts whose words may be class names"""
+    template_dirs = [str(path) for engine in settings.TEMPLATES for path in engine.get('DIRS', [])]
+    python_dirs = []
+    for app_config in apps.get_app_configs():
+        if app_config.name == 'django.contrib.admin':
+            continue
+        template_dirs.append(os.path.join(app_config.path, 'templates'))
+        if app_config.path.startswith(str(settings.BASE_DIR)):
+            python_dirs.append(app_config.path)
+
+    for directory in template_dirs:
+        for root, _, files in os.walk(directory):
+            yield from (os.path.join(root, name) for name in files if name.endswith(('.html', '.txt')))
+    for directory in python_dirs:
+        for root, _, files in os.walk(directory):
+            if 'migrations' not in root.split(os.sep):
+                yield from (os.path.join(root, name) for name in files if name.endswith('.py'))
+    for root, _, files in os.walk(static_dir()):
+        yield from (os.path.join(root, name) for name in files if name.endswith('.js'))
+
+
+def used_tokens():
+    """Every word that could be a class name somewhere in the portal"""
+    tokens = set(SAFELIST)
+    for path in _source_files():
+        with open(path, encoding='utf-8', errors='replace') as source:
+            tokens.update(TOKEN_RE.findall(source.read()))
+    return tokens
+
+
+def _strip_comments(css):
+    out = []
+    i = 0
+    quote = None
+    while i < len(css):
+        char = css[i]
+        if quote:
+            out.append(char)
+            if char == '\\':
+                out.append(css[i + 1:i + 2])
+                i += 1
+            elif char == quote:
+                quote = None
+        elif css.startswith('/*', i):
+            end = css.find('*/', i + 2)
+            i = len(css) if end == -1 else end + 1
+        else:
+            if char in '"\'':
+                quote = char
+            out.append(char)
+        i += 1
+    return ''.join(out)
+
+
+def _scan(css, i, stops):
+    """Index of the first character of `stops` at nesting depth 0, outside strings"""
+    depth = 0
+    quote = None
+    while i < len(css):
+        char = css[i]
+        if quote:
+            if char == '\\':
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif depth == 0 and char in stops:
+            return i
+        elif char in '([{':
+            depth += 1
+        elif char in ')]}':
+            depth -= 1
+        i += 1
+    return i
+
+
+def parse(css, i=0):
+    """
+    Parse comment-free CSS into [(prelude, body)], where body is None for
+    statements like @charset, a list for grouping at-rules and the raw
+    block text otherwise; returns (rules, index after the closing brace).
+    """
+    rules = []
+    while True:
+        while i < len(css) and css[i].isspace():
+            i += 1
+        if i >= len(css) or css[i] == '}':
+            return rules, i + 1
+        end = _scan(css, i, ';{}')
+        prelude = css[i:end].strip()
+        at_rule = AT_RULE_RE.match(prelude)
+        if end >= len(css) or css[end] != '{':
+            rules.append((prelude, None))
+            i = end + 1 if end < len(css) and css[end] == ';' else end
+        elif at_rule and at_rule.group(0).lower() in GROUPING_AT_RULES:
+            children, i = parse(css, end + 1)
+            rules.append((prelude, children))
+        else:
+            close = _scan(css, end + 1, '}')
+            rules.append((prelude, css[end + 1:close]))
+            i = close + 1
+
+
+def _split_selectors(prelude):
+    selectors = []
+    i = 0
+    while i <= len(prelude):
+        end = _scan(prelude, i, ',')
+        selectors.append(prelude[i:end].strip())
+        i = end + 1
+    return selectors
+
+
+def _selector_classes(selector):
+    # Classes in :not()/:is() arguments and attribute values don't need to be present
+    outer = None
+    while outer != selector:
+        outer, selector = selector, NESTED_RE.sub('', selector)
+    return CLASS_RE.findall(selector)
+
+
+def purge(rules, tokens):
+    """Drop selectors naming a class that isn't in `tokens`, and rules left with none"""
+    kept = []
+    for prelude, body in rules:
+        if isinstance(body, list):
+            children = purge(body, tokens)
+            if children:
+                kept.append((prelude, children))
+        elif body is None or prelude.startswith('@'):
+            kept.append((prelude, body))
+        else:
+            selectors = [s for s in _split_selectors(prelude) if all(c in tokens for c in _selector_classes(s))]
+            if selectors:
+                kept.append((','.join(selectors), body))
+    return kept
+
+
+def serialize(rules):
+    return ''.join(
+        f'{prelude};' if body is None else
+        f'{prelude}{{{serialize(body) if isinstance(body, list) else body.strip()}}}'
+        for prelude, body in rules
+    )
+
+
+def _rebase_urls(css, source, target):
+    """Rewrite relative url()s in `source` (a static path) to work from `target`"""
+    def rebase(match):
+        url = match.group(2).strip()
+        if url.startswith(('data:', '/', '#')) or '://' in url:
+            return match.group(0)
+        resolved = posixpath.normpath(posixpath.join(posixpath.dirname(source), url))
+        return f'url({posixpath.relpath(resolved, posixpath.dirname(target))})'
+    return URL_RE.sub(rebase, css)
+
+
+def build_bundle(tokens=None):
+    """
+    Purge the vendored stylesheets into static/css/vendor.css; returns
+    (bytes before, bytes after).
+    """
+    tokens = used_tokens() if tokens is None else tokens
+    before = 0
+    parts = []
+    for path in BUNDLED_STYLESHEETS:
+        with open(os.path.join(vendor_dir(), path), encoding='utf-8') as stylesheet:
+            css = stylesheet.read()
+        before += len(css.encode())
+        rules, _ = parse(_strip_comments(css))
+        # Only valid at the very start of a stylesheet; the bundle is UTF-8 anyway
+        rules = [rule for rule in rules if not rule[0].lower().startswith('@charset')]
+        parts.append(_rebase_urls(serialize(purge(rules, tokens)), f'vendor/{path}', BUNDLE_NAME))
+
+    bundle = '\n'.join(parts) + '\n'
+    _write_static(BUNDLE_NAME, bundle)
+    _write_static(FONTS_NAME, font_faces())
+    return before, len(bundle.encode())
+
+
+def font_faces():
+    """@font-face rules for the vendored Poppins weights, relative to FONTS_NAME"""
+    rules = []
+    for weight in POPPINS_WEIGHTS:
+        path = f'vendor/poppins/poppins-latin-{weight}-normal.woff2'
+        if not os.path.isfile(os.path.join(static_dir(), path)):
+            raise FileNotFoundError(2, 'No such file', os.path.join(static_dir(), path))
+        rules.append(
+            f"@font-face{{font-family:'Poppins';font-style:normal;font-weight:{weight};font-display:swap;"
+            f"src:url({posixpath.relpath(path, posixpath.dirname(FONTS_NAME))}) format('woff2')}}"
+        )
+    return '\n'.join(rules) + '\n'
+
+
+def _write_static(name, content):
+    target = os.path.join(static_dir(), name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'w', encoding='utf-8') as destination:
+        destination.write(content)
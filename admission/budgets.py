@@ -0,0 +1,128 @@
+"""
+Query budgets for the portal's pages and admin changelists.
+
+A budget is the number of queries a warm request makes: caches are
+filled and a resubmitted form changes nothing. It is the same at every
+dataset size, so a per-row query that creeps in breaks it. The test suite
+holds every page to its budget with assertNumQueries; the
+check_performance_budgets command reports counts and latencies on larger
+datasets.
+"""
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+QUERY_BUDGETS = {
+    'home': 0,
+    'register': 0,
+    'about': 0,
+    'contact': 0,
+    'courses': 0,
+    'dashboard': 1,
+    'application_form GET': 6,
+    'application_form POST personal': 3,
+    'application_form POST schools': 4,
+    'application_form POST ssce': 4,
+    'application_form POST courses': 3,
+    'application_form POST declaration': 3,
+    'application_form POST documents': 7,
+    'application PDF': 3,
+    'passport photo': 2,
+    'admin users': 5,
+    'admin students': 4,
+    'admin payments': 4,
+    'admin applications': 4,
+    'admin referral codes': 4,
+    'admin jobs': 5,
+    'admin paystack events': 5,
+    'admin stored files': 4,
+    'admin statistics': 2,
+}
+
+PUBLIC_PAGES = {
+    'home': '/',
+    'register': '/register/',
+    'about': '/about/',
+    'contact': '/contact/',
+    'courses': '/courses/',
+}
+
+ADMIN_CHANGELISTS = {
+    'admin users': '/admin/auth/user/',
+    'admin students': '/admin/admission/student/',
+    'admin payments': '/admin/admission/payment/',
+    'admin applications': '/admin/admission/application/',
+    'admin referral codes': '/admin/admission/referralcode/',
+    'admin jobs': '/admin/admission/job/',
+    'admin paystack events': '/admin/admission/paystackevent/',
+    'admin stored files': '/admin/admission/storedfile/',
+    'admin statistics': '/admin/admission/admissionstatistic/',
+}
+
+
+def shared_cache_settings(location):
+    """Settings for a file-based cache at `location`, with the cache-backed sessions and dashboards it allows"""
+    return {
+        'CACHES': {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location, 'KEY_PREFIX': 'chsth',
+        }},
+        'SHARED_CACHE': True,
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+    }
+
+
+def _formset(prefix, total, rows):
+    data = {
+        f'{prefix}-TOTAL_FORMS': str(total),
+        f'{prefix}-INITIAL_FORMS': '0',
+        f'{prefix}-MIN_NUM_FORMS': '0',
+        f'{prefix}-MAX_NUM_FORMS': str(total),
+    }
+    for index, row in enumerate(rows):
+        data.update({f'{prefix}-{index}-{field}': value for field, value in row.items()})
+    return data
+
+
+def section_posts(application):
+    """
+    Valid application_form POST bodies for each section of `application`.
+    A body that is callable has to be built afresh for every request.
+    """
+    ssce = {
+        'sitting_number': '1', 'exam_type': 'waec', 'exam_number': '123456789',
+        'registration_number': '987654321', 'centre_number': '123456',
+        'centre_name': 'Government Secondary School Hadejia', 'year': '2016',
+        'english_grade': 'B2', 'mathematics_grade': 'C4', 'biology_grade': 'B3',
+        'chemistry_grade': 'C5', 'physics_grade': 'C6',
+        'subject_1': 'Geography', 'subject_1_grade': 'A1', 'subject_2': 'Economics', 'subject_2_grade': 'B2',
+        'subject_3': 'Hausa', 'subject_3_grade': 'A1', 'subject_4': 'Civic Education', 'subject_4_grade': 'B3',
+    }
+    return {
+        'personal': {
+            'section': 'personal',
+            'first_name': application.first_name, 'surname': application.surname,
+            'other_name': '', 'date_of_birth': application.date_of_birth.isoformat(),
+            'phone': application.phone, 'email': application.email,
+            'address': application.address, 'lga': application.lga,
+            'state_of_origin': application.state_of_origin,
+            'guardian_name': application.guardian_name, 'guardian_phone': application.guardian_phone,
+            'guardian_address': application.guardian_address,
+            'guardian_relationship': application.guardian_relationship,
+        },
+        'schools': {'section': 'schools', **_formset('schools', 3, [
+            {'school_name': 'Central Primary School Hadejia', 'from_year': '2004', 'to_year': '2010'},
+            {'school_name': 'Government Secondary School Hadejia', 'from_year': '2010', 'to_year': '2016'},
+        ])},
+        'ssce': {'section': 'ssce', **_formset('ssce', 2, [ssce])},
+        'courses': {
+            'section': 'courses',
+            'first_choice': 'diploma_xray', 'second_choice': 'diploma_nutrition',
+        },
+        'declaration': {
+            'section': 'declaration',
+            'declaration_text': 'I declare that the information given is correct.',
+        },
+        # Uploads are consumed by each request
+        'documents': lambda: {'section': 'documents', **_formset('documents', 5, [{
+            'document_type': 'birth_cert',
+            'document': SimpleUploadedFile('birth.pdf', b'%PDF-1.4 budget check', 'application/pdf'),
+        }])},
+    }
@@ -0,0 +1,170 @@
+"""
+Page and per-student caching.
+
+Anonymous visitors to home, about, contact and courses get a stored copy
+of the whole page. Cache keys carry a version built from APPLICATION_FEE,
+the template files and the static files manifest, so a fee change, a
+template edit or a collectstatic that renames assets is picked up without
+clearing the cache by hand.
+
+Each student's dashboard state is cached under their user id and dropped
+whenever a row it was built from changes: by model signals for saves, and
+by explicit invalidate_dashboards() calls after bulk updates. That needs a
+cache shared by every process (settings.SHARED_CACHE); with a per-process
+cache the dashboard is built on every request.
+
+The crispy markup of unbound forms is cached under the form's fields, its
+initial values and a version of the template pack's templates: the same
+form showing the same values renders the same HTML.
+"""
+import hashlib
+import os
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.db import transaction
+from django.forms import ModelChoiceField
+from django.http import HttpResponse
+from django.template.loader import get_template
+from django.utils import translation
+from django.utils.safestring import mark_safe
+
+from .models import Student
+
+BASE_TEMPLATE = 'base.html'
+
+
+def _static_manifest():
+    manifest_name = getattr(staticfiles_storage, 'manifest_name', None)
+    return staticfiles_storage.path(manifest_name) if manifest_name else None
+
+
+def template_version(*template_names):
+    """Short hash of the templates' and static manifest's file stamps and the application fee"""
+    digest = hashlib.sha1(str(settings.APPLICATION_FEE).encode())
+    origins = [get_template(name).origin.name for name in template_names] + [_static_manifest()]
+    for origin in filter(None, origins):
+        try:
+            stat = os.stat(origin)
+        except OSError:
+            continue
+        digest.update(f'{origin}:{stat.st_mtime_ns}:{stat.st_size}'.encode())
+    return digest.hexdigest()[:12]
+
+
+def _is_anonymous(request):
+    # Decided from cookies alone, so a cache hit never loads a session
+    return settings.SESSION_COOKIE_NAME not in request.COOKIES and CookieStorage.cookie_name not in request.COOKIES
+
+
+def cache_anonymous_page(template_name):
+    """
+    Serve anonymous GET/HEAD requests for the decorated view from the
+    cache. Visitors with a session (logged in, or with pending messages)
+    always get a freshly rendered page, as do requests with a query
+    string, which would otherwise add a cache entry per distinct one.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not _is_anonymous(request) or request.META.get('QUERY_STRING'):
+                return view(request, *args, **kwargs)
+
+            version = template_version(template_name, BASE_TEMPLATE)
+            key = f'page:{view.__name__}:{version}:{request.path}'
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                cache.set(key, (response.content, response['Content-Type']), settings.PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+
+def _dashboard_key(user_id):
+    return f'dashboard:{user_id}'
+
+
+def cached_dashboard_state(user, build):
+    """Return the user's dashboard state, calling `build(user)` on a miss"""
+    if not settings.SHARED_CACHE:
+        # Invalidations from other workers and process_jobs would never reach this process
+        return build(user)
+    key = _dashboard_key(user.pk)
+    state = cache.get(key)
+    if state is None:
+        state = build(user)
+        cache.set(key, state, settings.DASHBOARD_CACHE_TIMEOUT)
+    return state
+
+
+def invalidate_dashboards(user_ids=(), student_ids=()):
+    """
+    Drop cached dashboard state for the given users and students once the
+    current transaction commits, so a concurrent request can't cache the
+    state from before it.
+    """
+    if not settings.SHARED_CACHE:
+        return
+    user_ids = set(user_ids)
+    student_ids = set(student_ids)
+    if student_ids:
+        user_ids.update(Student.objects.filter(pk__in=student_ids).values_list('user_id', flat=True))
+    if user_ids:
+        keys = [_dashboard_key(user_id) for user_id in user_ids]
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+@lru_cache(maxsize=None)
+def _form_signature(form_class):
+    """Hash of the form class's declared fields, so changing them in code changes its cache keys"""
+    digest = hashlib.sha1(f'{form_class.__module__}.{form_class.__qualname__}'.encode())
+    for name, field in form_class.base_fields.items():
+        # Labels may be lazy translations, whose repr differs between processes
+        choices = [(str(value), str(label)) for value, label in getattr(field, 'choices', ())]
+        digest.update(repr((
+            name, type(field).__name__, type(field.widget).__name__, str(field.label), str(field.help_text),
+            field.required, sorted(field.widget.attrs.items()), choices,
+        )).encode())
+    return digest.hexdigest()[:12]
+
+
+def _shows_stored_data(form):
+    """True if the form is bound, edits a saved instance or is prefilled with anything but empty values"""
+    if form.is_bound:
+        return True
+    instance = getattr(form, 'instance', None)
+    if instance is not None and instance.pk is not None:
+        return True
+    return any(form[name].value() not in field.empty_values for name, field in form.fields.items())
+
+
+def cached_form_html(form, render):
+    """
+    Return `render(form)`, the form's crispy markup, from the cache when
+    the form is blank, like the registration form. Forms showing submitted
+    or stored data - an applicant's personal details - are never written
+    to the cache, and model choices come from the database, so those
+    render every time.
+    """
+    if _shows_stored_data(form) or any(isinstance(field, ModelChoiceField) for field in form.fields.values()):
+        return render(form)
+
+    pack = settings.CRISPY_TEMPLATE_PACK
+    # Blank forms differ only in how their inputs are named
+    digest = hashlib.sha1(repr((form.prefix, form.auto_id)).encode()).hexdigest()
+    version = template_version(f'{pack}/uni_form.html', f'{pack}/field.html')
+    key = f'form:{pack}:{version}:{_form_signature(type(form))}:{translation.get_language()}:{digest}'
+    html = cache.get(key)
+    if html is None:
+        html = str(render(form))
+        cache.set(key, html, settings.FRAGMENT_CACHE_TIMEOUT)
+    return mark_safe(html)
@@ -0,0 +1,19 @@
+"""System checks for what the portal needs in place before it is served"""
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+from .assets import missing_outputs
+
+
+@register(Tags.staticfiles)
+def check_built_assets(app_configs, **kwargs):
+    """base.html links the vendored assets, so build_assets must have run"""
+    missing = missing_outputs()
+    if not missing:
+        return []
+    level = Error if settings.REQUIRE_BUILT_ASSETS else Warning
+    return [level(
+        f"The vendored front-end assets are missing: {', '.join(missing)}.",
+        hint='Run `python manage.py build_assets` and commit static/css/ and static/vendor/.',
+        id='admission.E001' if level is Error else 'admission.W001',
+    )]
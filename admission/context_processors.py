@@ -0,0 +1,12 @@
+from django.conf import settings
+
+from .caching import BASE_TEMPLATE, template_version
+
+
+def fragment_cache(request):
+    """Timeout and version for the base template's cached navbar and footer"""
+    return {
+        'fragment_cache_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+        'fragment_version': template_version(BASE_TEMPLATE),
+    }
+
@@ -1,10 +1,9 @@
 from django import forms
+from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
-from crispy_forms.helper import FormHelper
-from crispy_forms.layout import Layout, Submit, Row, Column, Field, HTML, Div
-from crispy_forms.bootstrap import FormActions
 from .models import *
+from .images import check_passport_decodes, check_passport_image
 
 class StudentRegistrationForm(UserCreationForm):
     email = forms.EmailField(required=True)
@@ -14,45 +13,22 @@ class StudentRegistrationForm(UserCreationForm):
     referral_code = forms.CharField(max_length=10, required=False, 
                                   help_text="Optional: Enter referral code to skip payment")
 
+    REFERRAL_CODE_ERROR = "Invalid or already used referral code."
+
     class Meta:
         model = User
         fields = ('username', 'first_name', 'last_name', 'email', 'phone', 'password1', 'password2', 'referral_code')
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.layout = Layout(
-            HTML('<h4 class="mb-4"><i class="fas fa-user-plus"></i> Student Registration</h4>'),
-            Row(
-                Column('first_name', css_class='form-group col-md-6 mb-3'),
-                Column('last_name', css_class='form-group col-md-6 mb-3'),
-                css_class='form-row'
-            ),
-            Row(
-                Column('username', css_class='form-group col-md-6 mb-3'),
-                Column('email', css_class='form-group col-md-6 mb-3'),
-                css_class='form-row'
-            ),
-            Field('phone', css_class='form-control mb-3'),
-            Field('referral_code', css_class='form-control mb-3'),
-            Row(
-                Column('password1', css_class='form-group col-md-6 mb-3'),
-                Column('password2', css_class='form-group col-md-6 mb-3'),
-                css_class='form-row'
-            ),
-            FormActions(
-                Submit('submit', 'Register', css_class='btn btn-primary btn-lg btn-block'),
-            )
-        )
-
     def clean_referral_code(self):
-        referral_code = self.cleaned_data.get('referral_code')
+        """Return the matching unused ReferralCode, or None if none was entered"""
+        # Codes are stored in upper case
+        referral_code = self.cleaned_data.get('referral_code', '').upper()
         if referral_code:
             try:
-                code = ReferralCode.objects.get(code=referral_code, is_used=False)
+                return ReferralCode.objects.only('pk').get(code=referral_code, is_used=False)
             except ReferralCode.DoesNotExist:
-                raise forms.ValidationError("Invalid or already used referral code.")
-        return referral_code
+                raise forms.ValidationError(self.REFERRAL_CODE_ERROR)
+        return None
 
 class ApplicationPersonalInfoForm(forms.ModelForm):
     class Meta:
@@ -64,34 +40,18 @@ class ApplicationPersonalInfoForm(forms.ModelForm):
             'address': forms.Textarea(attrs={'rows': 3}),
         }
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.layout = Layout(
-            HTML('<h5 class="mb-4"><i class="fas fa-user"></i> Personal Information</h5>'),
-            Row(
-                Column('passport_photo', css_class='form-group col-md-12 mb-3'),
-                css_class='form-row'
-            ),
-            Row(
-                Column('first_name', css_class='form-group col-md-4 mb-3'),
-                Column('surname', css_class='form-group col-md-4 mb-3'),
-                Column('other_name', css_class='form-group col-md-4 mb-3'),
-                css_class='form-row'
-            ),
-            Row(
-                Column('date_of_birth', css_class='form-group col-md-6 mb-3'),
-                Column('phone', css_class='form-group col-md-6 mb-3'),
-                css_class='form-row'
-            ),
-            Field('email', css_class='form-control mb-3'),
-            Field('address', css_class='form-control mb-3'),
-            Row(
-                Column('lga', css_class='form-group col-md-6 mb-3'),
-                Column('state_of_origin', css_class='form-group col-md-6 mb-3'),
-                css_class='form-row'
-            ),
-        )
+    def clean_passport_photo(self):
+        photo = self.cleaned_data.get('passport_photo')
+        # Only a fresh upload carries the image header decoded by ImageField
+        image = getattr(photo, 'image', None)
+        if image is not None:
+            check_passport_image(image)
+            if photo.size <= settings.PASSPORT_INLINE_MAX_BYTES:
+                # Normalised during this request, so a truncated file must fail here rather than after saving
+                photo.seek(0)
+                check_passport_decodes(photo)
+                photo.seek(0)
+        return photo
 
 class GuardianInfoForm(forms.ModelForm):
     class Meta:
@@ -101,20 +61,6 @@ class GuardianInfoForm(forms.ModelForm):
             'guardian_address': forms.Textarea(attrs={'rows': 3}),
         }
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.layout = Layout(
-            HTML('<h5 class="mb-4"><i class="fas fa-users"></i> Guardian/Next of Kin Information</h5>'),
-            Row(
-                Column('guardian_name', css_class='form-group col-md-6 mb-3'),
-                Column('guardian_phone', css_class='form-group col-md-6 mb-3'),
-                css_class='form-row'
-            ),
-            Field('guardian_address', css_class='form-control mb-3'),
-            Field('guardian_relationship', css_class='form-control mb-3'),
-        )
-
 class SchoolAttendedForm(forms.ModelForm):
     class Meta:
         model = SchoolAttended
@@ -139,20 +85,21 @@ class SSCEResultForm(forms.ModelForm):
         for field_name, field in self.fields.items():
             field.widget.attrs['class'] = 'form-control'
 
+class BaseSSCEFormSet(forms.BaseFormSet):
+    """Applications hold one SSCE result per sitting, so a sitting may only be entered once"""
+
+    def clean(self):
+        if any(self.errors):
+            return
+        sittings = [form.cleaned_data['sitting_number'] for form in self.forms if form.cleaned_data]
+        if len(sittings) != len(set(sittings)):
+            raise forms.ValidationError("Each sitting can only be entered once.")
+
 class CourseSelectionForm(forms.ModelForm):
     class Meta:
         model = Application
         fields = ['first_choice', 'second_choice']
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.layout = Layout(
-            HTML('<h5 class="mb-4"><i class="fas fa-graduation-cap"></i> Course Selection</h5>'),
-            Field('first_choice', css_class='form-control mb-3'),
-            Field('second_choice', css_class='form-control mb-3'),
-        )
-
     def clean(self):
         cleaned_data = super().clean()
         first_choice = cleaned_data.get('first_choice')
@@ -171,17 +118,6 @@ class DeclarationForm(forms.ModelForm):
             'declaration_text': forms.Textarea(attrs={'rows': 4}),
         }
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.helper = FormHelper()
-        self.helper.layout = Layout(
-            HTML('<h5 class="mb-4"><i class="fas fa-file-signature"></i> Declaration</h5>'),
-            HTML('<p class="text-muted mb-3">Please type your full name and the following declaration:</p>'),
-            HTML('<p class="font-italic">"I hereby declare that the information provided in this application form is true and correct to the best of my knowledge. I understand that any false information may lead to the cancellation of my admission."</p>'),
-            Field('declaration_text', css_class='form-control mb-3',
-                 placeholder='Type your full name and the declaration statement above...'),
-        )
-
 class DocumentUploadForm(forms.ModelForm):
     class Meta:
         model = UploadedDocument
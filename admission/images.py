@@ -0,0 +1,185 @@
+"""
+Passport photograph ingestion.
+
+Uploads are checked cheaply while the request is handled (format and
+pixel count, which guards against decompression bombs). The expensive
+part - auto-orienting, stripping EXIF, cropping to passport size,
+re-encoding as progressive JPEG and making thumbnails - runs inline only
+for small uploads and in the background job queue otherwise. A file that
+turns out to be truncated or corrupt once it is decoded is taken off the
+application, so the applicant is asked for the photograph again.
+"""
+import hashlib
+import logging
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from . import jobs
+from .models import Application
+from .storage import release, retain
+
+logger = logging.getLogger(__name__)
+
+PROCESS_PASSPORT = 'process_passport'
+
+# 35 x 45 mm at 300 dpi
+PASSPORT_SIZE = (413, 531)
+THUMBNAIL_SIZES = {
+    'small': (96, 123),
+    'medium': (240, 308),
+}
+JPEG_QUALITY = 85
+PASSPORT_FIELDS = ('passport_photo', 'passport_thumbnail_small', 'passport_thumbnail_medium')
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+# What Pillow raises for image data it can't decode: truncated, corrupt or not an image
+DECODE_ERRORS = (OSError, SyntaxError, ValueError, Image.DecompressionBombError)
+DAMAGED_MESSAGE = "The passport photograph is damaged or incomplete. Please upload it again."
+
+
+def check_passport_image(image):
+    """Reject formats and dimensions we won't decode, from the header alone"""
+    if image.format not in ALLOWED_FORMATS:
+        raise ValidationError("Upload the passport photograph as a JPEG, PNG or WebP image.")
+    width, height = image.size
+    if width * height > settings.PASSPORT_MAX_PIXELS:
+        raise ValidationError(
+            f"The passport photograph is too large ({width} x {height} pixels). Please upload a smaller image."
+        )
+
+
+def check_passport_header(source):
+    """Check the image in `source` from its header alone, without decoding the pixels"""
+    try:
+        with Image.open(source) as image:
+            check_passport_image(image)
+    except DECODE_ERRORS:
+        raise ValidationError(DAMAGED_MESSAGE)
+
+
+def check_passport_decodes(source):
+    """Decode the whole image in `source`, which catches the truncated files the header check lets through"""
+    try:
+        with Image.open(source) as image:
+            check_passport_image(image)
+            image.load()
+    except DECODE_ERRORS:
+        raise ValidationError(DAMAGED_MESSAGE)
+
+
+def _encode(image, size):
+    output = BytesIO()
+    # Saving without an exif argument leaves all EXIF/GPS metadata behind
+    ImageOps.fit(image, size, Image.LANCZOS, centering=(0.5, 0.4)).save(
+        output, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True
+    )
+    return output.getvalue()
+
+
+def normalise_passport(source):
+    """
+    Return (passport, {thumbnail size: bytes}) as progressive JPEG bytes
+    from the file-like `source`. Raises ValidationError if it can't be decoded.
+    """
+    try:
+        image = Image.open(source)
+        check_passport_image(image)
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        passport = _encode(image, PASSPORT_SIZE)
+        thumbnails = {name: _encode(image, size) for name, size in THUMBNAIL_SIZES.items()}
+    except DECODE_ERRORS:
+        raise ValidationError(DAMAGED_MESSAGE)
+    return passport, thumbnails
+
+
+def process_passport(application):
+    """
+    Replace the application's uploaded photo with the normalised version
+    and store its thumbnails. Returns False if the photo was replaced by
+    a newer upload while this one was being processed. Raises
+    ValidationError, after taking the photo off the application, if it
+    can't be decoded.
+    """
+    previous = [getattr(application, field).name for field in PASSPORT_FIELDS]
+    try:
+        with application.passport_photo.open('rb') as source:
+            passport, thumbnails = normalise_passport(source)
+    except ValidationError:
+        _discard_passport(application, previous)
+        raise
+
+    application.passport_photo.save('passport.jpg', ContentFile(passport), save=False)
+    application.passport_thumbnail_small.save('passport_small.jpg', ContentFile(thumbnails['small']), save=False)
+    application.passport_thumbnail_medium.save('passport_medium.jpg', ContentFile(thumbnails['medium']), save=False)
+    current = [getattr(application, field).name for field in PASSPORT_FIELDS]
+
+    # Conditional UPDATE: never clobber a newer upload or the student's other edits
+    updated = Application.objects.filter(pk=application.pk, passport_photo=previous[0]).update(
+        **dict(zip(PASSPORT_FIELDS, current))
+    )
+    if not updated:
+        # Unreferenced files are left for gc_media, another upload may share them
+        return False
+    # update() bypasses the model signals, so count the references here
+    retain(current)
+    release(previous)
+    application._stored_names = dict(zip(PASSPORT_FIELDS, current))
+    return True
+
+
+def _discard_passport(application, previous):
+    """Take an undecodable photo off the application, unless a newer upload has replaced it"""
+    cleared = dict.fromkeys(PASSPORT_FIELDS, '')
+    if Application.objects.filter(pk=application.pk, passport_photo=previous[0]).update(**cleared):
+        release(previous)
+        for field in PASSPORT_FIELDS:
+            setattr(application, field, '')
+        application._stored_names = cleared
+
+
+def schedule_passport_processing(application):
+    """
+    Normalise a freshly uploaded passport photo: inline when it is small,
+    otherwise in the background job queue. Each upload gets its own job,
+    so a photo replaced before the worker reaches it doesn't swallow the
+    job for its replacement.
+    """
+    if application.passport_photo.size <= settings.PASSPORT_INLINE_MAX_BYTES:
+        process_passport(application)
+    else:
+        name = application.passport_photo.name
+        jobs.enqueue(
+            PROCESS_PASSPORT,
+            key=f'{application.pk}:{hashlib.md5(name.encode()).hexdigest()}',
+            payload={'application': application.pk, 'name': name},
+        )
+
+
+@jobs.handler(PROCESS_PASSPORT)
+def process_passport_job(job):
+    """Normalise a large passport upload off the request thread"""
+    # Jobs queued before the key carried the photo had just the application's pk
+    application_pk = job.payload.get('application', job.key)
+    try:
+        application = Application.objects.get(pk=application_pk)
+    except Application.DoesNotExist:
+        return
+    if application.passport_photo.name != job.payload.get('name'):
+        # Superseded by a newer upload, which was scheduled separately
+        return
+    try:
+        process_passport(application)
+    except ValidationError:
+        # Retrying won't repair the file; it is off the application, so the applicant uploads it again
+        logger.warning("Passport photo %s of application %s could not be decoded", job.payload['name'], application.pk)
@@ -0,0 +1,107 @@
+"""
+Minimal database-backed job queue.
+
+Jobs are rows in the `Job` table. Web requests enqueue them and return
+immediately; the `process_jobs` management command claims and runs them.
+Handlers are registered per job kind with the `handler` decorator.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+# A running job that hasn't been touched for this long belongs to a dead worker
+STALE_AFTER = timedelta(minutes=10)
+
+# Retry delay grows as RETRY_BASE * 2 ** attempts, capped at RETRY_MAX
+RETRY_BASE = timedelta(seconds=15)
+RETRY_MAX = timedelta(minutes=30)
+
+_handlers = {}
+
+
+def handler(kind):
+    """Register the decorated function as the handler for `kind` jobs"""
+    def register(func):
+        _handlers[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, key='', payload=None, delay=None):
+    """Queue a job, reusing an identical queued or running one if present"""
+    existing = Job.objects.filter(kind=kind, key=key, status__in=ACTIVE_STATUSES).first()
+    if existing:
+        return existing
+    run_after = timezone.now() + delay if delay else timezone.now()
+    return Job.objects.create(kind=kind, key=key, payload=payload or {}, run_after=run_after)
+
+
+def is_pending(kind, keys):
+    """Return True if any of `keys` has a queued or running `kind` job"""
+    return Job.objects.filter(kind=kind, key__in=keys, status__in=ACTIVE_STATUSES).exists()
+
+
+def requeue_stale():
+    """Hand jobs abandoned by crashed workers back to the queue"""
+    cutoff = timezone.now() - STALE_AFTER
+    return Job.objects.filter(status='running', updated_at__lt=cutoff).update(
+        status='queued', updated_at=timezone.now()
+    )
+
+
+def claim(batch_size=10, kinds=None):
+    """
+    Claim up to `batch_size` due jobs for this worker.
+
+    Each job is claimed with a conditional UPDATE, so several workers can
+    poll the same table without running a job twice.
+    """
+    now = timezone.now()
+    due = Job.objects.filter(status='queued', run_after__lte=now)
+    if kinds:
+        due = due.filter(kind__in=kinds)
+    claimed = []
+    for pk in due.order_by('run_after', 'pk').values_list('pk', flat=True)[:batch_size]:
+        won = Job.objects.filter(pk=pk, status='queued').update(
+            status='running', attempts=F('attempts') + 1, updated_at=now
+        )
+        if won:
+            claimed.append(pk)
+    return list(Job.objects.filter(pk__in=claimed).order_by('run_after', 'pk'))
+
+
+def run(job):
+    """Run a claimed job and record the outcome"""
+    func = _handlers.get(job.kind)
+    if func is None:
+        job.status = 'failed'
+        job.last_error = f"No handler registered for job kind '{job.kind}'"
+        job.save(update_fields=['status', 'last_error', 'updated_at'])
+        return False
+
+    try:
+        func(job)
+    except Exception:
+        logger.exception("Job %s (%s %s) failed", job.pk, job.kind, job.key)
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+        else:
+            job.status = 'queued'
+            job.run_after = timezone.now() + min(RETRY_BASE * 2 ** job.attempts, RETRY_MAX)
+        job.save(update_fields=['status', 'last_error', 'run_after', 'updated_at'])
+        return False
+
+    job.status = 'done'
+    job.last_error = ''
+    job.save(update_fields=['status', 'last_error', 'updated_at'])
+    return True
@@ -0,0 +1,73 @@
+from crispy_forms.templatetags.crispy_forms_filters import as_crispy_form
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from admission.caching import cached_form_html
+from admission.forms import StudentRegistrationForm
+from admission.models import Application
+from admission.seed import seed_admissions
+import statistics
+import tempfile
+import time
+
+class Command(BaseCommand):
+    help = ('Measure what crispy form rendering costs the registration and application pages, '
+            'with the rendered markup of blank forms and page fragments cached and without')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Renders per measurement')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1.')
+        self.requests = options['requests']
+
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+                seed_admissions(1)
+                application = Application.objects.select_related('student__user').get()
+                rows = self.measure(application)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(f"{'measurement':<44}{'uncached ms':>14}{'cached ms':>12}{'saved':>8}")
+        for name, uncached, cached in rows:
+            self.stdout.write(f'{name:<44}{uncached:>14.2f}{cached:>12.2f}{100 * (1 - cached / uncached):>7.0f}%')
+        self.stdout.write(self.style.SUCCESS('Benchmark complete.'))
+
+    def median_ms(self, work):
+        timings = []
+        for _ in range(self.requests):
+            started = time.perf_counter()
+            work()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def measure(self, application):
+        """Return [(measurement, uncached median ms, cached median ms)]"""
+        cache.clear()
+
+        def registration_form(render):
+            return lambda: render(StudentRegistrationForm())
+
+        cached = lambda form: cached_form_html(form, as_crispy_form)
+        rows = [
+            ('registration form crispy render', self.median_ms(registration_form(as_crispy_form)),
+             self.median_ms(registration_form(cached))),
+        ]
+
+        # Whole pages, with fragment caching (navbar, footer, blank forms) off and on
+        client = Client()
+        client.force_login(application.student.user)
+        for name, url in [('application_form GET', '/application/'), ('register GET (logged in)', '/register/')]:
+            get = lambda: client.get(url)
+            cache.clear()
+            with override_settings(FRAGMENT_CACHE_TIMEOUT=0):
+                uncached = self.median_ms(get)
+            get()
+            rows.append((name, uncached, self.median_ms(get)))
+        return rows
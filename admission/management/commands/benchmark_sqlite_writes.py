@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand, CommandError
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+PROFILES = ('plain', 'production')
+
+def _init_worker(path, profile):
+    # Settings read SQLITE_PATH/SQLITE_PROFILE from the environment at setup
+    os.environ['SQLITE_PATH'] = path
+    os.environ['SQLITE_PROFILE'] = profile
+    import django
+    django.setup()
+
+def _migrate():
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+def _write_for(worker, seconds):
+    """Run registration-shaped write transactions for `seconds`; returns (latencies, errors)"""
+    from django.contrib.auth.models import User
+    from django.db import OperationalError, connection, transaction
+    from admission.models import Student
+
+    latencies = []
+    errors = 0
+    n = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        username = f'bench-{worker}-{n}'
+        n += 1
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                # Read, then write: the pattern that breaks deferred transactions
+                if User.objects.filter(username=username).exists():
+                    continue
+                user = User.objects.create(username=username, password='!', email=f'{username}@example.com')
+                student = Student.objects.create(user=user, phone='+2348000000000')
+                Student.objects.filter(pk=student.pk).update(can_apply=True)
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+    return latencies, errors
+
+class Command(BaseCommand):
+    help = 'Measure sustained concurrent write throughput on SQLite with the plain and production profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8, help='Concurrent writer processes')
+        parser.add_argument('--seconds', type=float, default=5, help='How long each profile is measured')
+        parser.add_argument('--profile', action='append', dest='profiles', choices=PROFILES,
+                            help='Profile to measure (repeatable); defaults to both')
+
+    def handle(self, *args, **options):
+        if options['processes'] < 1:
+            raise CommandError('--processes must be at least 1.')
+        self.stdout.write(f"{'profile':<12}{'writes/sec':>12}{'errors':>8}{'p50 ms':>10}{'p99 ms':>10}")
+        for profile in options['profiles'] or PROFILES:
+            with tempfile.TemporaryDirectory() as directory:
+                result = self.measure(profile, os.path.join(directory, 'bench.sqlite3'),
+                                      options['processes'], options['seconds'])
+            self.stdout.write('{:<12}{:>12,.0f}{:>8}{:>10.1f}{:>10.1f}'.format(profile, *result))
+        self.stdout.write(self.style.SUCCESS('Benchmark complete.'))
+
+    def measure(self, profile, path, processes, seconds):
+        # Fresh interpreters, so each profile's settings and connections are its own
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(1, context, _init_worker, (path, profile)) as pool:
+            pool.submit(_migrate).result()
+
+        with ProcessPoolExecutor(processes, context, _init_worker, (path, profile)) as pool:
+            # Start every worker before timing so django.setup() isn't measured
+            list(pool.map(time.sleep, [0.5] * processes))
+            started = time.monotonic()
+            results = list(pool.map(_write_for, range(processes), [seconds] * processes))
+            elapsed = time.monotonic() - started
+
+        latencies = sorted(latency for worker, _ in results for latency in worker)
+        errors = sum(errors for _, errors in results)
+        if not latencies:
+            return 0, errors, 0, 0
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        return len(latencies) / elapsed, errors, statistics.median(latencies) * 1000, p99 * 1000
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from admission.assets import BUNDLE_NAME, build_bundle, fetch_vendor_files
+from urllib.error import URLError
+
+class Command(BaseCommand):
+    help = ('Fetch the vendored front-end assets and purge unused rules into static/css/vendor.css. '
+            'Run before collectstatic whenever templates gain new classes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--update', action='store_true',
+                            help='Re-download every vendored file and record new hashes in the lock file')
+        parser.add_argument('--offline', action='store_true',
+                            help='Only rebuild the purged stylesheet from the files already vendored')
+
+    def handle(self, *args, **options):
+        if not options['offline']:
+            try:
+                fetched = fetch_vendor_files(update=options['update'], log=self.stdout.write)
+            except (URLError, ValueError) as exc:
+                raise CommandError(f'Could not fetch vendored assets: {exc}')
+            self.stdout.write(f'{fetched} vendored file(s) fetched.')
+
+        try:
+            before, after = build_bundle()
+        except FileNotFoundError as exc:
+            raise CommandError(f'{exc.filename} is missing; run without --offline to fetch it.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {BUNDLE_NAME}: {after:,} bytes from {before:,} ({100 * after / before:.0f}%).'
+        ))
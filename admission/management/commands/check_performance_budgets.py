@@ -0,0 +1,117 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from admission.budgets import ADMIN_CHANGELISTS, PUBLIC_PAGES, QUERY_BUDGETS, section_posts, shared_cache_settings
+from admission.models import Application
+from admission.seed import seed_admissions
+import tempfile
+import time
+
+# Latency ceilings in milliseconds for the fastest of the measured runs
+LATENCY_CEILINGS = {
+    'home': 150,
+    'register': 300,
+    'dashboard': 200,
+    'application_form GET': 600,
+    'application PDF': 300,
+}
+DEFAULT_LATENCY_CEILING = 500
+ADMIN_LATENCY_CEILING = 1500
+
+class Command(BaseCommand):
+    help = ('Benchmark every view and admin changelist on a seeded test database: report query counts '
+            'against their budgets (enforced by the test suite) and check latency ceilings')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,100,1000',
+                            help='Comma-separated applicant counts to seed and measure at')
+        parser.add_argument('--repeat', type=int, default=3, help='Requests per measurement; the fastest counts')
+        parser.add_argument('--latency-factor', type=float, default=1.0,
+                            help='Multiply latency ceilings, e.g. 2 on slow CI machines')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the generated dataset')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        self.repeat = max(options['repeat'], 1)
+
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Budgets assume a deployment with a cache shared by every process
+            with tempfile.TemporaryDirectory() as media_root, tempfile.TemporaryDirectory() as cache_dir, \
+                    override_settings(MEDIA_ROOT=media_root, **shared_cache_settings(cache_dir)):
+                results = self.measure(sizes, options['seed'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        failures = self.report(sizes, results, options['latency_factor'])
+        if failures:
+            raise CommandError('Latency ceilings exceeded:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('All latency ceilings met.'))
+
+    def measure(self, sizes, seed):
+        """Return {name: {size: (queries, best milliseconds)}}"""
+        results = {}
+        staff = User.objects.create_superuser('budget-admin', 'admin@example.com', 'budget-admin')
+        seeded = 0
+        for size in sizes:
+            seeded += seed_admissions(size - seeded, seed=seed)
+            application = Application.objects.filter(is_submitted=False).select_related('student__user').first()
+            if application is None:
+                raise CommandError('The seeded dataset has no unsubmitted application to measure with.')
+
+            anonymous = Client()
+            student = Client()
+            student.force_login(application.student.user)
+            admin = Client()
+            admin.force_login(staff)
+
+            checks = [(name, anonymous, 'get', url, None) for name, url in PUBLIC_PAGES.items()] + [
+                ('dashboard', student, 'get', '/dashboard/', None),
+                ('application_form GET', student, 'get', '/application/', None),
+            ]
+            for section, data in section_posts(application).items():
+                checks.append((f'application_form POST {section}', student, 'post', '/application/', data))
+            checks.append(('application PDF', student, 'get', '/application/pdf/', None))
+            checks.append(('passport photo', student, 'get', application.passport_photo.url, None))
+            for name, url in ADMIN_CHANGELISTS.items():
+                checks.append((name, admin, 'get', url, None))
+
+            for name, client, method, url, data in checks:
+                results.setdefault(name, {})[size] = self.run_check(client, method, url, data)
+        return results
+
+    def run_check(self, client, method, url, data):
+        best = None
+        for _ in range(self.repeat):
+            payload = data() if callable(data) else data
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = getattr(client, method)(url, payload) if payload else getattr(client, method)(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code >= 400:
+                raise CommandError(f'{method.upper()} {url} returned HTTP {response.status_code}')
+            best = elapsed if best is None else min(best, elapsed)
+        return len(queries), best
+
+    def report(self, sizes, results, latency_factor):
+        failures = []
+        self.stdout.write(f"{'check':<36}{'budget':>8}" + ''.join(f'{size:>18}' for size in sizes))
+        for name, by_size in results.items():
+            self.stdout.write(f"{name:<36}{QUERY_BUDGETS.get(name, '-'):>8}" + ''.join(
+                f'{by_size[size][0]:>6} q {by_size[size][1]:>7.1f} ms' for size in sizes
+            ))
+
+            if name.startswith('admin '):
+                ceiling = ADMIN_LATENCY_CEILING
+            else:
+                ceiling = LATENCY_CEILINGS.get(name, DEFAULT_LATENCY_CEILING)
+            ceiling *= latency_factor
+            slowest = max(by_size[size][1] for size in sizes)
+            if slowest > ceiling:
+                failures.append(f'{name}: {slowest:.0f} ms, ceiling is {ceiling:.0f} ms')
+        return failures
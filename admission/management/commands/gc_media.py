@@ -0,0 +1,143 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from admission.models import Application, StoredFile, UploadedDocument
+from admission.uploads import UPLOAD_DIR, expire_uploads
+import datetime
+import heapq
+import os
+import posixpath
+import time
+
+# (model, field) pairs whose values name files in MEDIA_ROOT
+FILE_FIELDS = [
+    (Application, 'passport_photo'),
+    (Application, 'passport_thumbnail_small'),
+    (Application, 'passport_thumbnail_medium'),
+    (UploadedDocument, 'document'),
+]
+
+# Directories managed elsewhere, e.g. the PDF cache prunes itself and
+# unfinished chunked uploads are expired with their sessions below
+EXCLUDED_PREFIXES = ('pdf_cache/', f'{UPLOAD_DIR}/')
+
+class Command(BaseCommand):
+    help = 'Find and delete media files that no application or document references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report orphaned files without deleting them')
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='Leave files modified more recently than this alone')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Orphans to re-check and delete per round trip')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        root = str(settings.MEDIA_ROOT)
+        if not os.path.isdir(root):
+            raise CommandError(f'MEDIA_ROOT {root} does not exist.')
+
+        grace = datetime.timedelta(hours=options['grace_hours'])
+        self.root = root
+        self.dry_run = options['dry_run']
+        self.verbosity = options['verbosity']
+        self.cutoff = time.time() - grace.total_seconds()
+        self.stale_before = timezone.now() - grace
+        self.scanned = self.recent = self.deleted = self.freed = 0
+
+        started = time.monotonic()
+        batch = []
+        for name, size, mtime in self.orphaned_files():
+            if mtime > self.cutoff:
+                self.recent += 1
+                continue
+            batch.append((name, size))
+            if len(batch) >= options['batch_size']:
+                self.collect(batch)
+                batch = []
+        if batch:
+            self.collect(batch)
+        expired = expire_uploads(self.stale_before, dry_run=self.dry_run)
+        elapsed = time.monotonic() - started
+
+        verb = 'Would delete' if self.dry_run else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'Scanned {self.scanned} files in {elapsed:.2f}s. {verb} {self.deleted} orphaned files '
+            f'({self.freed / 1024 / 1024:.1f} MB); {self.recent} orphans are within the grace period. '
+            f'{verb} {expired} abandoned partial uploads.'
+        ))
+
+    def walk(self, directory=''):
+        """Yield (name, size, mtime) for every file under MEDIA_ROOT, sorted by name"""
+        with os.scandir(os.path.join(self.root, directory)) as it:
+            # 'a/' sorts after 'a.jpg', exactly as the full names 'a/x' and 'a.jpg' do
+            entries = sorted(it, key=lambda entry: entry.name + '/' if entry.is_dir(follow_symlinks=False) else entry.name)
+        for entry in entries:
+            name = posixpath.join(directory, entry.name) if directory else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if not (name + '/').startswith(EXCLUDED_PREFIXES):
+                    yield from self.walk(name)
+            elif entry.is_file(follow_symlinks=False):
+                stat = entry.stat(follow_symlinks=False)
+                yield name, stat.st_size, stat.st_mtime
+
+    def referenced_names(self):
+        """Yield every file name the database references, sorted, possibly repeated"""
+        streams = [
+            model.objects.exclude(**{field: ''}).order_by(field).values_list(field, flat=True).iterator(chunk_size=2000)
+            for model, field in FILE_FIELDS
+        ]
+        streams.append(
+            StoredFile.objects.filter(references__gt=0).order_by('name').values_list('name', flat=True).iterator(chunk_size=2000)
+        )
+        previous = ''
+        for name in heapq.merge(*streams):
+            if name < previous:
+                raise CommandError('The database does not sort file names by code point; cannot merge with the file system.')
+            previous = name
+            yield name
+
+    def orphaned_files(self):
+        """Merge-join the sorted file system walk against the sorted references"""
+        references = self.referenced_names()
+        reference = next(references, None)
+        for name, size, mtime in self.walk():
+            self.scanned += 1
+            while reference is not None and reference < name:
+                reference = next(references, None)
+            if reference != name:
+                yield name, size, mtime
+
+    def collect(self, batch):
+        """Re-check a batch of orphans against the database and delete the ones still orphaned"""
+        names = [name for name, _ in batch]
+        # Anything referenced since the scan read past it is kept
+        for model, field in FILE_FIELDS:
+            referenced = set(model.objects.filter(**{f'{field}__in': names}).values_list(field, flat=True))
+            names = [name for name in names if name not in referenced]
+        referenced = set(StoredFile.objects.filter(name__in=names, references__gt=0).values_list('name', flat=True))
+        names = set(names) - referenced
+
+        deleted = []
+        for name, size in batch:
+            if name not in names:
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                if os.stat(path).st_mtime > self.cutoff:
+                    # Re-uploaded since the walk; content-addressed saves touch the file
+                    self.recent += 1
+                    continue
+                if not self.dry_run:
+                    os.remove(path)
+            except FileNotFoundError:
+                continue
+            if self.verbosity >= 2:
+                self.stdout.write(f'{"Orphaned" if self.dry_run else "Deleted"}: {name} ({size} bytes)')
+            deleted.append(name)
+            self.freed += size
+        self.deleted += len(deleted)
+
+        if deleted and not self.dry_run:
+            StoredFile.objects.filter(name__in=deleted, references=0, updated_at__lt=self.stale_before).delete()
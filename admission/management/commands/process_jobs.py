@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from admission import jobs
+import time
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs such as Paystack payment verification'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit instead of polling')
+        parser.add_argument('--batch-size', type=int, default=10, help='Jobs to claim per poll')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--kind', action='append', dest='kinds', help='Only run jobs of this kind (repeatable)')
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        try:
+            while True:
+                jobs.requeue_stale()
+                claimed = jobs.claim(options['batch_size'], options['kinds'])
+                for job in claimed:
+                    if jobs.run(job):
+                        done += 1
+                    else:
+                        failed += 1
+                        self.stderr.write(f'Job {job.pk} ({job.kind} {job.key}) failed, status {job.status}')
+                if not claimed:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Processed {done + failed} jobs ({done} succeeded, {failed} failed).')
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from admission.statistics import rebuild
+import time
+
+class Command(BaseCommand):
+    help = 'Recompute the admission statistics from the application and payment tables'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rows = rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {rows} admission statistics in {time.monotonic() - started:.2f}s.'
+        ))
@@ -0,0 +1,124 @@
+"""
+Serving private media files.
+
+Access is checked by the view; the bytes are then handed to the front-end
+server when MEDIA_SENDFILE is configured (nginx `X-Accel-Redirect` or
+Apache/lighttpd `X-Sendfile`), so a download costs the app server one
+short request. Without it the file is streamed from Django, honouring a
+single byte range so interrupted downloads can resume.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from .storage import CONTENT_PREFIX
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def media_path(name):
+    """Absolute path of the media file `name`; raises Http404 if it's missing or outside MEDIA_ROOT"""
+    try:
+        path = default_storage.path(name)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(path):
+        raise Http404
+    return path
+
+
+def serve_media(request, name):
+    """Response delivering the media file `name` to a caller already allowed to see it"""
+    path = media_path(name)
+    stat = os.stat(path)
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        return not_modified
+
+    sendfile = settings.MEDIA_SENDFILE
+    if sendfile == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+    elif sendfile == 'apache':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        response = _ranged_file_response(request, path, stat.st_size, etag, stat.st_mtime, content_type)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if name.startswith(CONTENT_PREFIX + '/'):
+        # Content-addressed names never change content
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    else:
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _ranged_file_response(request, path, size, etag, mtime, content_type):
+    byte_range = _requested_range(request, size, etag, mtime)
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    elif byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read_range(path, start, end), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _requested_range(request, size, etag, mtime):
+    """
+    (start, end) of a satisfiable single byte range, False for an
+    unsatisfiable one, or None to send the whole file.
+    """
+    header = request.META.get('HTTP_RANGE', '').strip()
+    match = RANGE_RE.match(header)
+    if not match or not any(match.groups()):
+        # Absent, malformed or multi-range requests get the whole file
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != int(mtime):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if not length:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
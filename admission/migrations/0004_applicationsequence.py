@@ -0,0 +1,43 @@
+# Generated by Django 4.2.24 on 2026-10-17 03:25
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    """Start each year's sequence after the highest number already issued"""
+    Application = apps.get_model('admission', 'Application')
+    ApplicationSequence = apps.get_model('admission', 'ApplicationSequence')
+    highest = {}
+    for number in Application.objects.values_list('application_number', flat=True).iterator():
+        try:
+            _, year, serial = number.split('/')
+            year, serial = int(year), int(serial)
+        except ValueError:
+            continue
+        highest[year] = max(highest.get(year, 0), serial)
+    ApplicationSequence.objects.bulk_create(
+        ApplicationSequence(year=year, last_number=serial) for year, serial in highest.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admission', '0003_paystackevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(unique=True)),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Application Sequence',
+                'verbose_name_plural': 'Application Sequences',
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
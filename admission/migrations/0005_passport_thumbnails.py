@@ -0,0 +1,24 @@
+# Generated by Django 4.2.24 on 2026-10-17 03:32
+
+import admission.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admission', '0004_applicationsequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='passport_thumbnail_medium',
+            field=models.ImageField(blank=True, editable=False, upload_to=admission.models.upload_passport),
+        ),
+        migrations.AddField(
+            model_name='application',
+            name='passport_thumbnail_small',
+            field=models.ImageField(blank=True, editable=False, upload_to=admission.models.upload_passport),
+        ),
+    ]
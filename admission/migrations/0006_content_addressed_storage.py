@@ -0,0 +1,50 @@
+# Generated by Django 4.2.24 on 2026-10-17 03:35
+
+import admission.models
+import admission.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admission', '0005_passport_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.BigIntegerField(default=0)),
+                ('references', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Stored File',
+                'verbose_name_plural': 'Stored Files',
+            },
+        ),
+        migrations.AlterField(
+            model_name='application',
+            name='passport_photo',
+            field=models.ImageField(help_text='Upload passport photograph', storage=admission.storage.ContentAddressedStorage(), upload_to=admission.models.upload_passport),
+        ),
+        migrations.AlterField(
+            model_name='application',
+            name='passport_thumbnail_medium',
+            field=models.ImageField(blank=True, editable=False, storage=admission.storage.ContentAddressedStorage(), upload_to=admission.models.upload_passport),
+        ),
+        migrations.AlterField(
+            model_name='application',
+            name='passport_thumbnail_small',
+            field=models.ImageField(blank=True, editable=False, storage=admission.storage.ContentAddressedStorage(), upload_to=admission.models.upload_passport),
+        ),
+        migrations.AlterField(
+            model_name='uploadeddocument',
+            name='document',
+            field=models.FileField(storage=admission.storage.ContentAddressedStorage(), upload_to=admission.models.upload_document),
+        ),
+    ]
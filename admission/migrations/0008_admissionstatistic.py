@@ -0,0 +1,63 @@
+# Generated by Django 4.2.24 on 2026-10-17 03:47
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def count_existing(apps, schema_editor):
+    """Start the statistics from the applications and payments already stored"""
+    Application = apps.get_model('admission', 'Application')
+    Payment = apps.get_model('admission', 'Payment')
+    AdmissionStatistic = apps.get_model('admission', 'AdmissionStatistic')
+    totals = defaultdict(lambda: [0, 0])
+    fields = ('first_choice', 'second_choice', 'status', 'is_submitted')
+    for row in Application.objects.order_by().values(*fields).annotate(n=Count('pk')):
+        for key in [
+            ('first_choice', row['first_choice']),
+            ('second_choice', row['second_choice']),
+            ('application_status', row['status']),
+            ('submission', 'submitted' if row['is_submitted'] else 'draft'),
+        ]:
+            totals[key][0] += row['n']
+    payments = Payment.objects.order_by().values('status', day=TruncDate('created_at'))
+    for row in payments.annotate(n=Count('pk'), total=Sum('amount')):
+        keys = [('payment_status', row['status'])]
+        if row['status'] == 'success':
+            keys.append(('revenue', row['day'].isoformat()))
+        for key in keys:
+            totals[key][0] += row['n']
+            totals[key][1] += row['total']
+    AdmissionStatistic.objects.bulk_create(
+        AdmissionStatistic(metric=metric, key=key, count=count, amount=amount)
+        for (metric, key), (count, amount) in totals.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admission', '0007_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdmissionStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('first_choice', 'Applications by First Choice'), ('second_choice', 'Applications by Second Choice'), ('application_status', 'Applications by Status'), ('submission', 'Applications by Submission'), ('payment_status', 'Payments by Status'), ('revenue', 'Revenue by Day')], max_length=30)),
+                ('key', models.CharField(max_length=50)),
+                ('count', models.BigIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Admission Statistic',
+                'verbose_name_plural': 'Admission Statistics',
+                'unique_together': {('metric', 'key')},
+            },
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
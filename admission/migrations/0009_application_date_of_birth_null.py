@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-17 03:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admission', '0008_admissionstatistic'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='application',
+            name='date_of_birth',
+            field=models.DateField(null=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.24 on 2026-10-17 04:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admission', '0009_application_date_of_birth_null'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('purpose', models.CharField(choices=[('passport', 'Passport Photograph'), ('document', 'Document')], max_length=20)),
+                ('document_type', models.CharField(blank=True, choices=[('ssce_result', 'SSCE Results'), ('primary_cert', 'Primary School Certificate'), ('indigene_cert', 'Indigene Certificate'), ('birth_cert', 'Birth Certificate/Declaration of Age'), ('other_credentials', 'Other Credentials')], max_length=20)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('received', models.BigIntegerField(default=0)),
+                ('sha256', models.CharField(blank=True, max_length=64)),
+                ('stored_name', models.CharField(blank=True, max_length=255)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='admission.student')),
+            ],
+            options={
+                'verbose_name': 'Upload Session',
+                'verbose_name_plural': 'Upload Sessions',
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+from collections import Counter
+
+from django.core.files import File
+from django.db import migrations
+
+from admission.storage import CONTENT_PREFIX, content_storage
+
+# (model, field) pairs whose values name files in MEDIA_ROOT
+FILE_FIELDS = [
+    ('Application', 'passport_photo'),
+    ('Application', 'passport_thumbnail_small'),
+    ('Application', 'passport_thumbnail_medium'),
+    ('UploadedDocument', 'document'),
+]
+
+
+def rehash_legacy_media(apps, schema_editor):
+    """
+    Move files saved before content-addressed storage - one copy per save,
+    e.g. media/documents/5/*.pdf - under cas/ by the hash of their content,
+    so duplicates collapse into one file, then count every file's
+    references afresh. The legacy copies are left for gc_media to delete.
+    """
+    stored = {}
+    for model_name, field in FILE_FIELDS:
+        model = apps.get_model('admission', model_name)
+        legacy = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__startswith': f'{CONTENT_PREFIX}/'})
+        for pk, name in legacy.values_list('pk', field).iterator():
+            if name not in stored:
+                try:
+                    with content_storage.open(name, 'rb') as source:
+                        # Hashes the bytes and skips the write if they are already stored
+                        stored[name] = content_storage.save(name, File(source))
+                except FileNotFoundError:
+                    # Nothing to move; the row keeps its dangling name
+                    stored[name] = name
+            model.objects.filter(pk=pk).update(**{field: stored[name]})
+
+    StoredFile = apps.get_model('admission', 'StoredFile')
+    references = Counter()
+    for model_name, field in FILE_FIELDS:
+        model = apps.get_model('admission', model_name)
+        references.update(
+            model.objects.filter(**{f'{field}__startswith': f'{CONTENT_PREFIX}/'}).values_list(field, flat=True).iterator()
+        )
+    StoredFile.objects.update(references=0)
+    for name, count in references.items():
+        updated = StoredFile.objects.filter(name=name).update(references=count)
+        if not updated and content_storage.exists(name):
+            StoredFile.objects.create(name=name, references=count, size=content_storage.size(name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admission', '0010_uploadsession'),
+    ]
+
+    operations = [
+        # Backwards leaves the files under cas/, where the earlier schema reads them just as well
+        migrations.RunPython(rehash_legacy_media, migrations.RunPython.noop),
+    ]
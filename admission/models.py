@@ -1,10 +1,11 @@
 import os
 import uuid
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 from django.utils import timezone
-from PIL import Image
+from .storage import content_storage
 
 class ReferralCode(models.Model):
     code = models.CharField(max_length=10, unique=True)
@@ -16,9 +17,18 @@ class ReferralCode(models.Model):
     def __str__(self):
         return f"{self.code} - {'Used' if self.is_used else 'Available'}"
 
+    def save(self, *args, **kwargs):
+        # Registration looks codes up in upper case, however they were typed
+        self.code = self.code.upper()
+        return super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Referral Code"
         verbose_name_plural = "Referral Codes"
+        indexes = [
+            # Only unused codes are ever looked for, newest first; used ones pile up
+            models.Index(fields=['-id'], condition=models.Q(is_used=False), name='referralcode_unused_idx'),
+        ]
 
 class Student(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -72,6 +82,52 @@ class Payment(models.Model):
     class Meta:
         verbose_name = "Payment"
         verbose_name_plural = "Payments"
+        indexes = [
+            models.Index(fields=['student', 'status'], name='payment_student_status_idx'),
+            models.Index(fields=['status', 'created_at'], name='payment_status_created_idx'),
+            models.Index(fields=['created_at'], name='payment_created_idx'),
+        ]
+
+class ApplicationSequence(models.Model):
+    """Last application number handed out in each year"""
+    year = models.PositiveIntegerField(unique=True)
+    last_number = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.year}: {self.last_number}"
+
+    @classmethod
+    def next_number(cls, year):
+        """
+        Atomically allocate the next number for `year`.
+
+        The increment is a single UPDATE, which holds the row's write lock
+        until the caller's transaction ends, so concurrent callers are
+        serialised and never see the same number.
+        """
+        with transaction.atomic():
+            if not cls.objects.filter(year=year).update(last_number=F('last_number') + 1):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(year=year, last_number=1)
+                    return 1
+                except IntegrityError:
+                    # Another request created this year's row first
+                    cls.objects.filter(year=year).update(last_number=F('last_number') + 1)
+            return cls.objects.filter(year=year).values_list('last_number', flat=True).get()
+
+    @classmethod
+    def reserve(cls, year, count):
+        """Atomically allocate `count` consecutive numbers; returns the first"""
+        with transaction.atomic():
+            cls.objects.get_or_create(year=year)
+            cls.objects.filter(year=year).update(last_number=F('last_number') + count)
+            last = cls.objects.filter(year=year).values_list('last_number', flat=True).get()
+        return last - count + 1
+
+    class Meta:
+        verbose_name = "Application Sequence"
+        verbose_name_plural = "Application Sequences"
 
 def upload_passport(instance, filename):
     return f'passports/{instance.student.user.id}/{filename}'
@@ -101,11 +157,14 @@ class Application(models.Model):
     application_number = models.CharField(max_length=20, unique=True, editable=False)
     
     # Section A - Personal Information
-    passport_photo = models.ImageField(upload_to=upload_passport, help_text="Upload passport photograph")
+    passport_photo = models.ImageField(upload_to=upload_passport, storage=content_storage, help_text="Upload passport photograph")
+    passport_thumbnail_small = models.ImageField(upload_to=upload_passport, storage=content_storage, blank=True, editable=False)
+    passport_thumbnail_medium = models.ImageField(upload_to=upload_passport, storage=content_storage, blank=True, editable=False)
     first_name = models.CharField(max_length=50)
     surname = models.CharField(max_length=50)
     other_name = models.CharField(max_length=50, blank=True)
-    date_of_birth = models.DateField()
+    # Empty until the applicant saves the personal section; the form still requires it
+    date_of_birth = models.DateField(null=True)
     phone = models.CharField(max_length=17)
     email = models.EmailField()
     address = models.TextField()
@@ -133,12 +192,19 @@ class Application(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
-        if not self.application_number:
-            # Generate unique application number
+        if self.application_number:
+            return super().save(*args, **kwargs)
+        
+        # Number and row are written together so a failed insert leaves no gap
+        with transaction.atomic():
             year = timezone.now().year
-            count = Application.objects.filter(created_at__year=year).count() + 1
-            self.application_number = f"CHSTH/{year}/{count:04d}"
-        super().save(*args, **kwargs)
+            number = ApplicationSequence.next_number(year)
+            self.application_number = f"CHSTH/{year}/{number:04d}"
+            try:
+                super().save(*args, **kwargs)
+            except Exception:
+                self.application_number = ''
+                raise
 
     def __str__(self):
         return f"{self.application_number} - {self.student.user.get_full_name()}"
@@ -146,6 +212,14 @@ class Application(models.Model):
     class Meta:
         verbose_name = "Application"
         verbose_name_plural = "Applications"
+        indexes = [
+            # Admin changelist filters, alone or with the date filter
+            models.Index(fields=['status', 'created_at'], name='application_status_created_idx'),
+            # SQLite tests booleans as bare columns, which only a partial index matches
+            models.Index(fields=['-id'], condition=models.Q(is_submitted=True), name='application_submitted_idx'),
+            models.Index(fields=['first_choice', 'created_at'], name='application_choice_created_idx'),
+            models.Index(fields=['created_at'], name='application_created_idx'),
+        ]
 
 class SchoolAttended(models.Model):
     application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='schools_attended')
@@ -226,7 +300,7 @@ class UploadedDocument(models.Model):
 
     application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='documents')
     document_type = models.CharField(max_length=20, choices=DOCUMENT_TYPES)
-    document = models.FileField(upload_to=upload_document)
+    document = models.FileField(upload_to=upload_document, storage=content_storage)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -235,4 +309,127 @@ class UploadedDocument(models.Model):
     class Meta:
         verbose_name = "Uploaded Document"
         verbose_name_plural = "Uploaded Documents"
-        unique_together = ['application', 'document_type']
\ No newline at end of file
+        unique_together = ['application', 'document_type']
+
+class Job(models.Model):
+    """A unit of background work picked up by the `process_jobs` worker"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    key = models.CharField(max_length=100, blank=True, db_index=True)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.key} ({self.status})"
+
+    class Meta:
+        verbose_name = "Background Job"
+        verbose_name_plural = "Background Jobs"
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+
+class PaystackEvent(models.Model):
+    """Inbox of Paystack webhook deliveries, settled in batches"""
+    event_id = models.CharField(max_length=64, unique=True)
+    event = models.CharField(max_length=50)
+    reference = models.CharField(max_length=100, blank=True, db_index=True)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.event} - {self.reference}"
+
+    class Meta:
+        verbose_name = "Paystack Event"
+        verbose_name_plural = "Paystack Events"
+
+
+class StoredFile(models.Model):
+    """Reference count for a content-addressed upload in media storage"""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    references = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.references} references)"
+
+    class Meta:
+        verbose_name = "Stored File"
+        verbose_name_plural = "Stored Files"
+
+
+class UploadSession(models.Model):
+    """A chunked upload in progress, assembled in MEDIA_ROOT/uploads/ by admission.uploads"""
+    PURPOSE_CHOICES = [
+        ('passport', 'Passport Photograph'),
+        ('document', 'Document'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='upload_sessions')
+    purpose = models.CharField(max_length=20, choices=PURPOSE_CHOICES)
+    document_type = models.CharField(max_length=20, choices=UploadedDocument.DOCUMENT_TYPES, blank=True)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    # Bytes received so far; the next chunk must start here
+    received = models.BigIntegerField(default=0)
+    # SHA-256 the client announced, or of the assembled file once complete
+    sha256 = models.CharField(max_length=64, blank=True)
+    stored_name = models.CharField(max_length=255, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes)"
+
+    class Meta:
+        verbose_name = "Upload Session"
+        verbose_name_plural = "Upload Sessions"
+
+
+class AdmissionStatistic(models.Model):
+    """
+    Running count (and naira total, for payments) of one statistic, e.g.
+    metric 'first_choice' with key 'diploma_xray'. Maintained by
+    admission.statistics as rows change.
+    """
+    METRIC_CHOICES = [
+        ('first_choice', 'Applications by First Choice'),
+        ('second_choice', 'Applications by Second Choice'),
+        ('application_status', 'Applications by Status'),
+        ('submission', 'Applications by Submission'),
+        ('payment_status', 'Payments by Status'),
+        ('revenue', 'Revenue by Day'),
+    ]
+
+    metric = models.CharField(max_length=30, choices=METRIC_CHOICES)
+    key = models.CharField(max_length=50)
+    count = models.BigIntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.metric} {self.key}: {self.count}"
+
+    class Meta:
+        verbose_name = "Admission Statistic"
+        verbose_name_plural = "Admission Statistics"
+        unique_together = ['metric', 'key']
@@ -0,0 +1,148 @@
+"""Payment settlement shared by the webhook, the verification worker and the views"""
+import hashlib
+import hmac
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import jobs, paystack, statistics
+from .caching import invalidate_dashboards
+from .models import Job, Payment, PaystackEvent, Student
+
+VERIFY_PAYMENT = 'verify_payment'
+
+
+def request_verification(payment):
+    """
+    Queue a Paystack verification for a pending payment.
+
+    The job is delayed by PAYSTACK_VERIFY_DELAY so that, normally, the
+    webhook settles the payment first and the job finishes without an
+    outbound request.
+    """
+    return jobs.enqueue(
+        VERIFY_PAYMENT, key=payment.reference,
+        delay=timedelta(seconds=settings.PAYSTACK_VERIFY_DELAY)
+    )
+
+
+def is_verifying(student):
+    """Return True while one of the student's payments awaits verification"""
+    pending = student.payments.filter(status='pending').values('reference')
+    return jobs.is_pending(VERIFY_PAYMENT, pending)
+
+
+def settle_successful(references):
+    """
+    Mark payments successful and unlock their students.
+
+    Already-successful payments are left alone, so settling the same
+    reference twice is a no-op. Returns the number of payments settled.
+    """
+    if not references:
+        return 0
+    with transaction.atomic():
+        payments = Payment.objects.filter(reference__in=references).exclude(status='success')
+        # Bulk updates send no post_save, so drop the dashboards here, before the UPDATEs change the selection
+        invalidate_dashboards(user_ids=payments.values_list('student__user_id', flat=True))
+        Student.objects.filter(pk__in=payments.values('student_id')).update(has_paid=True, can_apply=True)
+        settled = statistics.update_payments(
+            payments, status='success', paystack_reference=F('reference'), updated_at=timezone.now()
+        )
+        # Nothing left for the verification worker to do
+        Job.objects.filter(kind=VERIFY_PAYMENT, key__in=references, status='queued').update(
+            status='done', updated_at=timezone.now()
+        )
+    return settled
+
+
+def settle_failed(references):
+    """Mark still-pending payments as failed"""
+    if not references:
+        return 0
+    payments = Payment.objects.filter(reference__in=references, status='pending')
+    with transaction.atomic():
+        invalidate_dashboards(user_ids=payments.values_list('student__user_id', flat=True))
+        return statistics.update_payments(payments, status='failed', updated_at=timezone.now())
+
+
+def is_successful_charge(data):
+    """Check a Paystack transaction record for a completed, full-amount charge"""
+    return data.get('status') == 'success' and data.get('amount', 0) >= settings.APPLICATION_FEE_KOBO
+
+
+def apply_verification(payment, data):
+    """Settle `payment` from a Paystack verification response"""
+    if data.get('status') and is_successful_charge(data.get('data') or {}):
+        settle_successful([payment.reference])
+        return True
+    settle_failed([payment.reference])
+    return False
+
+
+def signature_is_valid(body, signature):
+    """Check the X-Paystack-Signature header against the raw request body"""
+    if not settings.PAYSTACK_SECRET_KEY or not signature:
+        return False
+    expected = hmac.new(settings.PAYSTACK_SECRET_KEY.encode(), body, hashlib.sha512).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def record_event(event):
+    """
+    Store a webhook event in the inbox.
+
+    Paystack redelivers events it doesn't see acknowledged, so events are
+    keyed on their type and transaction; a redelivery returns False.
+    """
+    data = event.get('data') or {}
+    reference = str(data.get('reference') or '')
+    event_id = hashlib.sha256(
+        f"{event.get('event')}:{data.get('id')}:{reference}".encode()
+    ).hexdigest()
+    _, created = PaystackEvent.objects.get_or_create(
+        event_id=event_id,
+        defaults={'event': event.get('event', ''), 'reference': reference, 'payload': event},
+    )
+    return created
+
+
+def settle_events(batch_size=100):
+    """Settle unprocessed webhook events in batches; returns the number handled"""
+    handled = 0
+    while True:
+        with transaction.atomic():
+            events = list(
+                PaystackEvent.objects.filter(processed_at__isnull=True).order_by('pk')[:batch_size]
+            )
+            successful, failed = [], []
+            for event in events:
+                if event.event != 'charge.success' or not event.reference:
+                    continue
+                if is_successful_charge(event.payload.get('data') or {}):
+                    successful.append(event.reference)
+                else:
+                    failed.append(event.reference)
+            settle_successful(successful)
+            settle_failed(failed)
+            PaystackEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+                processed_at=timezone.now()
+            )
+        handled += len(events)
+        if len(events) < batch_size:
+            return handled
+
+
+@jobs.handler(VERIFY_PAYMENT)
+def verify_payment_job(job):
+    """Verify a payment with Paystack and settle the Payment/Student rows"""
+    try:
+        payment = Payment.objects.get(reference=job.key)
+    except Payment.DoesNotExist:
+        return
+    if payment.status != 'pending':
+        return
+    apply_verification(payment, paystack.verify_transaction(payment.reference))
@@ -0,0 +1,34 @@
+"""Thin client for the parts of the Paystack API the portal uses"""
+import requests
+from django.conf import settings
+
+
+class PaystackError(Exception):
+    """Paystack could not be reached or answered with a server error"""
+
+
+def verify_transaction(reference):
+    """
+    Look up a transaction on Paystack.
+
+    Returns the decoded response body. Network failures and 5xx answers
+    raise `PaystackError` so the caller can retry later.
+    """
+    headers = {
+        'Authorization': f'Bearer {settings.PAYSTACK_SECRET_KEY}',
+        'Content-Type': 'application/json',
+    }
+    try:
+        response = requests.get(
+            f'{settings.PAYSTACK_API_URL}/transaction/verify/{reference}',
+            headers=headers,
+            timeout=settings.PAYSTACK_TIMEOUT
+        )
+    except requests.exceptions.RequestException as e:
+        raise PaystackError(f'Could not reach Paystack: {e}') from e
+
+    if response.status_code >= 500:
+        raise PaystackError(f'Paystack returned HTTP {response.status_code}')
+    if response.status_code != 200:
+        return {'status': False, 'message': f'Paystack returned HTTP {response.status_code}'}
+    return response.json()
@@ -0,0 +1,264 @@
+"""
+Rendering and caching of the application form PDF.
+
+Rendered PDFs are kept in media storage under a fingerprint of the
+application's field values, so a PDF is rebuilt only after the
+application changes and a stale copy is never served.
+"""
+import hashlib
+import multiprocessing
+import os
+import posixpath
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+# Bump when the layout below changes so cached PDFs are re-rendered
+PDF_LAYOUT_VERSION = 1
+
+CACHE_DIR = 'pdf_cache'
+
+
+def application_pdf_filename(application):
+    return f"CHSTH_Application_{application.application_number}.pdf"
+
+
+def application_pdf_archive_name(application):
+    """Name of the application's PDF inside a bulk export ZIP"""
+    return application_pdf_filename(application).replace('/', '-')
+
+
+def application_pdf_fingerprint(application):
+    """Hash every stored field of the application, including updated_at"""
+    digest = hashlib.sha256(f"layout:{PDF_LAYOUT_VERSION}".encode())
+    for field in application._meta.concrete_fields:
+        digest.update(f"\0{field.attname}={field.value_to_string(application)}".encode())
+    return digest.hexdigest()
+
+
+def build_application_pdf(application, output):
+    """Write the application form PDF for `application` to the file-like `output`"""
+    doc = SimpleDocTemplate(output, pagesize=A4)
+    styles = getSampleStyleSheet()
+    story = []
+    
+    # Header
+    header = Paragraph("COLLEGE OF HEALTH SCIENCES AND TECHNOLOGY HADEJIA", styles['Title'])
+    story.append(header)
+    story.append(Spacer(1, 12))
+    
+    subheader = Paragraph("ADMISSION APPLICATION FORM", styles['Heading1'])
+    story.append(subheader)
+    story.append(Spacer(1, 12))
+    
+    # Application Number
+    app_num = Paragraph(f"<b>Application Number:</b> {application.application_number}", styles['Normal'])
+    story.append(app_num)
+    story.append(Spacer(1, 12))
+    
+    # Personal Information
+    personal_data = [
+        ['<b>SECTION A: PERSONAL INFORMATION</b>', ''],
+        ['First Name:', application.first_name],
+        ['Surname:', application.surname],
+        ['Other Name:', application.other_name or 'N/A'],
+        ['Date of Birth:', str(application.date_of_birth or '')],
+        ['Phone:', application.phone],
+        ['Email:', application.email],
+        ['Address:', application.address],
+        ['LGA:', application.lga],
+        ['State of Origin:', application.state_of_origin],
+    ]
+    
+    personal_table = Table(personal_data, colWidths=[2.5*inch, 4*inch])
+    personal_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    
+    story.append(personal_table)
+    story.append(Spacer(1, 12))
+    
+    # Guardian Information
+    guardian_data = [
+        ['<b>GUARDIAN/NEXT OF KIN INFORMATION</b>', ''],
+        ['Full Name:', application.guardian_name],
+        ['Phone:', application.guardian_phone],
+        ['Address:', application.guardian_address],
+        ['Relationship:', application.guardian_relationship],
+    ]
+    
+    guardian_table = Table(guardian_data, colWidths=[2.5*inch, 4*inch])
+    guardian_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    
+    story.append(guardian_table)
+    story.append(Spacer(1, 12))
+    
+    # Course Selection
+    course_data = [
+        ['<b>SECTION D: COURSE SELECTION</b>', ''],
+        ['First Choice:', application.get_first_choice_display()],
+        ['Second Choice:', application.get_second_choice_display()],
+    ]
+    
+    course_table = Table(course_data, colWidths=[2.5*inch, 4*inch])
+    course_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    
+    story.append(course_table)
+    story.append(Spacer(1, 12))
+    
+    # Declaration
+    if application.declaration_text:
+        declaration_header = Paragraph("<b>SECTION E: DECLARATION</b>", styles['Heading2'])
+        story.append(declaration_header)
+        story.append(Spacer(1, 6))
+        
+        declaration_text = Paragraph(application.declaration_text, styles['Normal'])
+        story.append(declaration_text)
+        story.append(Spacer(1, 12))
+    
+    # Footer
+    footer = Paragraph("This is a computer-generated document.", styles['Normal'])
+    story.append(footer)
+    
+    doc.build(story)
+
+
+def render_application_pdf(application):
+    """Return the application form PDF as bytes"""
+    buffer = BytesIO()
+    build_application_pdf(application, buffer)
+    return buffer.getvalue()
+
+
+def cached_application_pdf(application, fingerprint=None):
+    """
+    Return the storage name of the application's PDF, rendering it first
+    if the cached copy is missing or out of date.
+    """
+    fingerprint = fingerprint or application_pdf_fingerprint(application)
+    directory = posixpath.join(CACHE_DIR, str(application.pk))
+    name = posixpath.join(directory, f"{fingerprint}.pdf")
+    if default_storage.exists(name):
+        return name
+
+    saved = default_storage.save(name, ContentFile(render_application_pdf(application)))
+    if saved != name:
+        # A concurrent request rendered the same version first
+        default_storage.delete(saved)
+
+    # Drop copies rendered for earlier versions of the application
+    _, files = default_storage.listdir(directory)
+    for filename in files:
+        if filename != f"{fingerprint}.pdf":
+            default_storage.delete(posixpath.join(directory, filename))
+    return name
+
+
+def _init_render_worker():
+    import django
+    django.setup()
+
+
+def _render_for_archive(application):
+    return application_pdf_archive_name(application), render_application_pdf(application)
+
+
+def render_application_pdfs(applications, workers=None):
+    """
+    Render PDFs for an iterable of applications in a process pool.
+
+    Yields (archive name, PDF bytes) in input order. At most a few jobs per
+    worker are in flight, so memory stays flat however many applications
+    are exported.
+    """
+    workers = workers or os.cpu_count() or 1
+    window = workers * 4
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_render_worker,
+    )
+    try:
+        in_flight = deque()
+        for application in applications:
+            in_flight.append(pool.submit(_render_for_archive, application))
+            if len(in_flight) >= window:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+class _ZipStream:
+    """Write-only sink for ZipFile that hands written bytes back to the caller"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_application_pdfs_zip(applications, workers=None, progress=None):
+    """
+    Yield a ZIP archive of application PDFs chunk by chunk.
+
+    `progress`, if given, is called with the number of PDFs written so far.
+    """
+    sink = _ZipStream()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for count, (name, data) in enumerate(render_application_pdfs(applications, workers), 1):
+            archive.writestr(name, data)
+            if progress:
+                progress(count)
+            yield sink.drain()
+    yield sink.drain()
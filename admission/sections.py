@@ -0,0 +1,210 @@
+"""
+Sections of the application form.
+
+Each section is one form or formset: the personal, guardian, course and
+declaration forms edit fields of the Application row, and the schools,
+SSCE and documents formsets edit its related rows. `save_sections` writes
+only what the given sections hold, so the full-page form and the per-section
+JSON autosave share one code path, and `completeness` reports which
+sections are filled in.
+"""
+from django.db import transaction
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery
+from django.forms import formset_factory
+
+from .forms import (
+    ApplicationPersonalInfoForm, BaseSSCEFormSet, CourseSelectionForm, DeclarationForm, DocumentUploadForm,
+    GuardianInfoForm, SchoolAttendedForm, SSCEResultForm,
+)
+from .images import schedule_passport_processing
+from .models import Application, SchoolAttended, SSCEResult, UploadedDocument
+from .storage import release, retain
+
+SchoolFormSet = formset_factory(SchoolAttendedForm, extra=3, max_num=3)
+SSCEFormSet = formset_factory(SSCEResultForm, formset=BaseSSCEFormSet, extra=2, max_num=2)
+DocumentFormSet = formset_factory(DocumentUploadForm, extra=5, max_num=5)
+
+# Sections stored on the application row itself
+APPLICATION_FORMS = {
+    'personal': ApplicationPersonalInfoForm,
+    'guardian': GuardianInfoForm,
+    'courses': CourseSelectionForm,
+    'declaration': DeclarationForm,
+}
+# Sections stored as related rows; each formset's prefix is its section name
+FORMSETS = {
+    'schools': SchoolFormSet,
+    'ssce': SSCEFormSet,
+    'documents': DocumentFormSet,
+}
+SECTIONS = ('personal', 'guardian', 'schools', 'ssce', 'courses', 'declaration', 'documents')
+
+# Other credentials are optional
+REQUIRED_DOCUMENTS = ('ssce_result', 'primary_cert', 'indigene_cert', 'birth_cert')
+
+
+def bind_section(section, application, data, files=None, autosave=False):
+    """
+    The section's form or formset bound to the submitted data. Autosaves
+    carry no files - the passport photo is uploaded on its own - so for
+    them the photo is optional; submission still requires it.
+    """
+    if section in APPLICATION_FORMS:
+        form = APPLICATION_FORMS[section](data, files, instance=application)
+        if autosave and 'passport_photo' in form.fields:
+            form.fields['passport_photo'].required = False
+        return form
+    return FORMSETS[section](data, files, prefix=section)
+
+
+def _is_formset(form):
+    return hasattr(form, 'management_form')
+
+
+def section_errors(form):
+    """{input name: [messages]} for a bound form or formset; '__all__' holds errors not tied to a field"""
+    errors = {}
+    formset = form if _is_formset(form) else None
+    for bound in formset.forms if formset else [form]:
+        for field, messages in bound.errors.items():
+            errors.setdefault(field if field == '__all__' else bound.add_prefix(field), []).extend(messages)
+    if formset:
+        errors.setdefault('__all__', []).extend(formset.non_form_errors())
+    return {name: messages for name, messages in errors.items() if messages}
+
+
+def save_sections(application, bound):
+    """
+    Persist `bound`, {section: validated form or formset}. Application
+    fields are written in a single UPDATE of just the fields whose values
+    changed, so concurrent autosaves of different sections don't overwrite
+    each other and resubmitting unchanged data writes nothing.
+    """
+    fields = [name for section, form in bound.items() if section in APPLICATION_FORMS for name in form.changed_data]
+    new_passport = 'passport_photo' in fields
+    if new_passport:
+        application.passport_thumbnail_small = ''
+        application.passport_thumbnail_medium = ''
+        fields += ['passport_thumbnail_small', 'passport_thumbnail_medium']
+    if fields:
+        application.save(update_fields=fields + ['updated_at'])
+        if new_passport:
+            schedule_passport_processing(application)
+
+    if 'schools' in bound:
+        # Matched to the existing rows by position
+        _sync_rows(
+            SchoolAttended,
+            dict(enumerate(application.schools_attended.order_by('pk'))),
+            dict(enumerate(_submitted_instances(bound['schools'], application))),
+            SchoolAttendedForm._meta.fields,
+        )
+    if 'ssce' in bound:
+        # Matched to the existing rows by sitting
+        _sync_rows(
+            SSCEResult,
+            {result.sitting_number: result for result in application.ssce_results.all()},
+            {result.sitting_number: result for result in _submitted_instances(bound['ssce'], application)},
+            SSCEResultForm._meta.fields,
+        )
+    if 'documents' in bound:
+        _save_documents(application, _submitted_instances(bound['documents'], application))
+
+
+def completeness(application, related=None):
+    """
+    {'sections': {section: filled in?}, 'progress': percent, 'complete': bool}.
+    `related` is (has schools, has SSCE results, uploaded document types)
+    when the caller has them loaded already; otherwise one query finds out.
+    """
+    if related is None:
+        required_documents = UploadedDocument.objects.filter(
+            application=OuterRef('pk'), document_type__in=REQUIRED_DOCUMENTS,
+        ).order_by().values('application').annotate(count=Count('pk')).values('count')
+        row = Application.objects.filter(pk=application.pk).annotate(
+            has_schools=Exists(SchoolAttended.objects.filter(application=OuterRef('pk'))),
+            has_ssce=Exists(SSCEResult.objects.filter(application=OuterRef('pk'))),
+            required_documents=Subquery(required_documents, output_field=IntegerField()),
+        ).values('has_schools', 'has_ssce', 'required_documents').get()
+        has_schools, has_ssce = row['has_schools'], row['has_ssce']
+        has_documents = row['required_documents'] == len(REQUIRED_DOCUMENTS)
+    else:
+        has_schools, has_ssce, document_types = related
+        has_documents = set(REQUIRED_DOCUMENTS) <= set(document_types)
+
+    sections = {
+        section: all(
+            getattr(application, name) for name in form_class._meta.fields
+            if not Application._meta.get_field(name).blank
+        )
+        for section, form_class in APPLICATION_FORMS.items()
+    }
+    sections.update(schools=bool(has_schools), ssce=bool(has_ssce), documents=has_documents)
+    sections = {section: sections[section] for section in SECTIONS}
+    return {
+        'sections': sections,
+        'progress': round(100 * sum(sections.values()) / len(sections)),
+        'complete': all(sections.values()),
+    }
+
+
+def _submitted_instances(formset, application):
+    """Unsaved instances for the formset's filled-in forms, attached to `application`"""
+    instances = []
+    for form in formset:
+        if form.cleaned_data and not form.cleaned_data.get('DELETE'):
+            instance = form.save(commit=False)
+            instance.application = application
+            instances.append(instance)
+    return instances
+
+
+def _sync_rows(model, existing, wanted, fields, delete_missing=True):
+    """
+    Make the `existing` rows match the unsaved `wanted` instances, both
+    keyed alike, in one transaction: rows whose fields are unchanged cost
+    no writes, changed ones are bulk-updated, new keys bulk-created and
+    (with `delete_missing`) rows for keys no longer wanted deleted.
+    Returns (created, updated) instances.
+    """
+    created = [instance for key, instance in wanted.items() if key not in existing]
+    updated = []
+    changed_fields = set()
+    for key, instance in wanted.items():
+        row = existing.get(key)
+        if row is None:
+            continue
+        changed = [field for field in fields if getattr(row, field) != getattr(instance, field)]
+        for field in changed:
+            setattr(row, field, getattr(instance, field))
+        if changed:
+            updated.append(row)
+            changed_fields.update(changed)
+    removed = [row.pk for key, row in existing.items() if key not in wanted] if delete_missing else []
+
+    if created or updated or removed:
+        with transaction.atomic(savepoint=False):
+            model.objects.bulk_create(created)
+            if updated:
+                model.objects.bulk_update(updated, sorted(changed_fields))
+            if removed:
+                model.objects.filter(pk__in=removed).delete()
+    return created, updated
+
+
+def _save_documents(application, documents):
+    """Add or replace the application's documents, one per document type"""
+    existing = {document.document_type: document for document in application.documents.all()}
+    previous = {document_type: document.document.name for document_type, document in existing.items()}
+    wanted = {}
+    for document in documents:
+        # Store the upload first: re-uploading the same file gives the same name and no write
+        upload = document.document
+        document.document.save(upload.name, upload.file, save=False)
+        wanted[document.document_type] = document
+
+    # Bulk writes send no signals, so stored file references are counted here
+    with transaction.atomic():
+        created, updated = _sync_rows(UploadedDocument, existing, wanted, ['document'], delete_missing=False)
+        retain(document.document.name for document in created + updated)
+        release(previous[document.document_type] for document in updated)
@@ -0,0 +1,221 @@
+"""
+Deterministic synthetic admission data for benchmarks.
+
+Everything is created with bulk_create in batches, so large datasets
+build quickly and the same seed always produces the same rows.
+"""
+import datetime
+import random
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import BigIntegerField, Max
+from django.db.models.functions import Cast, Substr
+from django.utils import timezone
+from PIL import Image
+
+from .models import (
+    Application, ApplicationSequence, Payment, ReferralCode, SchoolAttended, SSCEResult, Student,
+    UploadedDocument,
+)
+from .statistics import record_created
+from .storage import content_storage, retain
+
+SEED_PASSWORD = 'seed-password'
+
+FIRST_NAMES = ['Aisha', 'Musa', 'Fatima', 'Ibrahim', 'Zainab', 'Usman', 'Hauwa', 'Sani', 'Amina', 'Yusuf']
+SURNAMES = ['Abdullahi', 'Bello', 'Garba', 'Haruna', 'Idris', 'Lawal', 'Mohammed', 'Sule', 'Umar', 'Yakubu']
+LGAS = ['Hadejia', 'Auyo', 'Kafin Hausa', 'Guri', 'Kirikasamma', 'Malam Madori', 'Birniwa']
+SUBJECTS = ['Geography', 'Economics', 'Hausa', 'Civic Education', 'Agricultural Science', 'Islamic Studies']
+GRADES = ['A1', 'B2', 'B3', 'C4', 'C5', 'C6']
+COURSES = [choice for choice, _ in Application.COURSE_CHOICES]
+STATUSES = [choice for choice, _ in Application.STATUS_CHOICES]
+
+DOCUMENT_TYPES = [choice for choice, _ in UploadedDocument.DOCUMENT_TYPES]
+
+
+def write_placeholder_files():
+    """
+    Store the passport and document files every seeded application points
+    at; returns their (passport, document) names.
+    """
+    image = BytesIO()
+    Image.new('RGB', (413, 531), (220, 220, 220)).save(image, 'JPEG', quality=70)
+    # Content-addressed, so repeated runs reuse the stored files
+    passport = content_storage.save('passport.jpg', ContentFile(image.getvalue()))
+    document = content_storage.save('document.pdf', ContentFile(b'%PDF-1.4\n% seeded placeholder document\n%%EOF\n'))
+    return passport, document
+
+
+def next_applicant_number():
+    """Number to give the next seeded applicant, after any seeded earlier"""
+    # Compared as numbers: as text, applicant10 sorts before applicant9
+    last = User.objects.filter(username__regex=r'^applicant[0-9]+$').aggregate(
+        last=Max(Cast(Substr('username', len('applicant') + 1), BigIntegerField()))
+    )['last']
+    return 0 if last is None else last + 1
+
+
+def seed_admissions(count, seed=0, batch_size=1000, start=None, progress=None):
+    """
+    Create `count` applicants with students, payments, referral codes,
+    applications, schools, SSCE results and uploaded documents.
+
+    Applicants are numbered from `start` (default: after those seeded
+    earlier), so repeated calls extend the dataset rather than colliding.
+    `progress`, if given, is called with the running total after each
+    batch. Returns the number of applicants created.
+    """
+    if start is None:
+        start = next_applicant_number()
+    placeholders = write_placeholder_files()
+    password = make_password(SEED_PASSWORD)
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        _seed_batch(start + created, size, random.Random(f'{seed}:{start + created}'), password, placeholders)
+        created += size
+        if progress:
+            progress(created)
+    return created
+
+
+def _seed_batch(first, size, rng, password, placeholders):
+    passport, document = placeholders
+    now = timezone.now()
+    with transaction.atomic():
+        users = User.objects.bulk_create([
+            User(
+                username=f'applicant{n:07d}',
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(SURNAMES),
+                email=f'applicant{n:07d}@example.com',
+                password=password,
+            )
+            for n in range(first, first + size)
+        ])
+
+        # Roughly one applicant in five registers with a referral code
+        codes = ReferralCode.objects.bulk_create([
+            ReferralCode(code=f'S{n:07d}', is_used=True, used_by=user, used_at=now)
+            for n, user in enumerate(users, first) if rng.random() < 0.2
+        ])
+        code_for_user = {code.used_by_id: code for code in codes}
+        ReferralCode.objects.bulk_create([
+            ReferralCode(code=f'F{n:07d}') for n in range(first, first + size) if rng.random() < 0.1
+        ])
+
+        students = []
+        paid = set()
+        for user in users:
+            code = code_for_user.get(user.pk)
+            has_paid = code is None and rng.random() < 0.7
+            if has_paid:
+                paid.add(user.pk)
+            students.append(Student(
+                user=user,
+                phone=f'+23480{rng.randrange(10 ** 8):08d}',
+                has_paid=has_paid,
+                referral_code=code,
+                can_apply=has_paid or code is not None,
+            ))
+        students = Student.objects.bulk_create(students)
+
+        payments = []
+        for student in students:
+            if student.referral_code_id:
+                continue
+            status = 'success' if student.user_id in paid else rng.choice(['pending', 'failed', 'cancelled'])
+            payments.append(Payment(
+                student=student,
+                reference=f'seed-{student.user.username}',
+                amount=settings.APPLICATION_FEE,
+                status=status,
+                paystack_reference=f'seed-{student.user.username}' if status == 'success' else '',
+            ))
+        Payment.objects.bulk_create(payments)
+        record_created(Payment, payments)
+
+        eligible = [student for student in students if student.can_apply]
+        year = now.year
+        number = ApplicationSequence.reserve(year, len(eligible)) if eligible else 0
+        applications = []
+        for offset, student in enumerate(eligible):
+            user = student.user
+            first_choice, second_choice = rng.sample(COURSES, 2)
+            submitted = rng.random() < 0.6
+            applications.append(Application(
+                student=student,
+                application_number=f'CHSTH/{year}/{number + offset:04d}',
+                passport_photo=passport,
+                first_name=user.first_name,
+                surname=user.last_name,
+                date_of_birth=datetime.date(1995, 1, 1) + datetime.timedelta(days=rng.randrange(3650)),
+                phone=student.phone,
+                email=user.email,
+                address=f'{rng.randrange(1, 200)} Kano Road, Hadejia',
+                lga=rng.choice(LGAS),
+                state_of_origin='Jigawa',
+                guardian_name=f'{rng.choice(FIRST_NAMES)} {user.last_name}',
+                guardian_phone=f'+23480{rng.randrange(10 ** 8):08d}',
+                guardian_address=f'{rng.randrange(1, 200)} Kano Road, Hadejia',
+                guardian_relationship=rng.choice(['Father', 'Mother', 'Uncle', 'Guardian']),
+                first_choice=first_choice,
+                second_choice=second_choice,
+                declaration_text=f'I, {user.get_full_name()}, declare that the information given is correct.',
+                status=rng.choice(STATUSES) if submitted else 'pending',
+                is_submitted=submitted,
+                submitted_at=now if submitted else None,
+            ))
+        applications = Application.objects.bulk_create(applications)
+        record_created(Application, applications)
+
+        schools = []
+        results = []
+        for application in applications:
+            schools.append(SchoolAttended(
+                application=application, school_name='Central Primary School Hadejia',
+                from_year='2004', to_year='2010',
+            ))
+            schools.append(SchoolAttended(
+                application=application, school_name='Government Secondary School Hadejia',
+                from_year='2010', to_year='2016',
+            ))
+            for sitting, exam_type in ((1, 'waec'), (2, 'neco')):
+                subjects = rng.sample(SUBJECTS, 4)
+                results.append(SSCEResult(
+                    application=application,
+                    sitting_number=sitting,
+                    exam_type=exam_type,
+                    exam_number=f'{rng.randrange(10 ** 9):09d}',
+                    registration_number=f'{rng.randrange(10 ** 9):09d}',
+                    centre_number=f'{rng.randrange(10 ** 6):06d}',
+                    centre_name='Government Secondary School Hadejia',
+                    year='2016',
+                    english_grade=rng.choice(GRADES),
+                    mathematics_grade=rng.choice(GRADES),
+                    biology_grade=rng.choice(GRADES),
+                    chemistry_grade=rng.choice(GRADES),
+                    physics_grade=rng.choice(GRADES),
+                    subject_1=subjects[0], subject_1_grade=rng.choice(GRADES),
+                    subject_2=subjects[1], subject_2_grade=rng.choice(GRADES),
+                    subject_3=subjects[2], subject_3_grade=rng.choice(GRADES),
+                    subject_4=subjects[3], subject_4_grade=rng.choice(GRADES),
+                ))
+        SchoolAttended.objects.bulk_create(schools)
+        SSCEResult.objects.bulk_create(results)
+
+        # Submitted applications carry every document; drafts some of them
+        documents = UploadedDocument.objects.bulk_create([
+            UploadedDocument(application=application, document_type=document_type, document=document)
+            for application in applications
+            for document_type in DOCUMENT_TYPES
+            if application.is_submitted or rng.random() < 0.5
+        ])
+
+        # bulk_create skips the signals that count file references
+        retain([passport] * len(applications) + [document] * len(documents))
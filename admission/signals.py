@@ -0,0 +1,114 @@
+"""Model signal receivers, connected in AdmissionConfig.ready()"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, post_save
+
+from . import statistics
+from .caching import invalidate_dashboards
+from .models import Application, Job, Payment, ReferralCode, Student, UploadedDocument
+from .payments import VERIFY_PAYMENT
+from .storage import release, retain
+
+# Model fields whose files live in content-addressed storage
+STORED_FILE_FIELDS = {
+    Application: ('passport_photo', 'passport_thumbnail_small', 'passport_thumbnail_medium'),
+    UploadedDocument: ('document',),
+}
+
+
+def _stored_names(instance):
+    names = {}
+    for attname in STORED_FILE_FIELDS[type(instance)]:
+        # Read the raw attribute: deferred fields are skipped, not loaded
+        value = instance.__dict__.get(attname)
+        if value is not None:
+            names[attname] = getattr(value, 'name', value) or ''
+    return names
+
+
+def _snapshot_stored_files(sender, instance, **kwargs):
+    instance._stored_names = _stored_names(instance)
+
+
+def _count_stored_files(sender, instance, created, **kwargs):
+    before = getattr(instance, '_stored_names', {})
+    after = _stored_names(instance)
+    retain(name for field, name in after.items() if before.get(field) != name)
+    release(name for field, name in before.items() if field in after and after[field] != name)
+    instance._stored_names = after
+
+
+def _release_stored_files(sender, instance, **kwargs):
+    release(_stored_names(instance).values())
+
+
+for model in STORED_FILE_FIELDS:
+    post_init.connect(_snapshot_stored_files, sender=model, dispatch_uid=f'snapshot_files_{model.__name__}')
+    post_save.connect(_count_stored_files, sender=model, dispatch_uid=f'count_files_{model.__name__}')
+    post_delete.connect(_release_stored_files, sender=model, dispatch_uid=f'release_files_{model.__name__}')
+
+
+def _invalidate_student_dashboard(sender, instance, **kwargs):
+    invalidate_dashboards(user_ids=[instance.user_id])
+
+
+def _invalidate_owner_dashboard(sender, instance, **kwargs):
+    if sender.student.is_cached(instance):
+        invalidate_dashboards(user_ids=[instance.student.user_id])
+    else:
+        invalidate_dashboards(student_ids=[instance.student_id])
+
+
+def _invalidate_redeemer_dashboard(sender, instance, **kwargs):
+    if instance.used_by_id:
+        invalidate_dashboards(user_ids=[instance.used_by_id])
+
+
+def _invalidate_verifying_dashboard(sender, instance, **kwargs):
+    # Queued and finished verifications flip the dashboard's "verifying" badge
+    if instance.kind == VERIFY_PAYMENT:
+        invalidate_dashboards(
+            student_ids=Payment.objects.filter(reference=instance.key).values_list('student_id', flat=True)
+        )
+
+
+for model, receiver in [
+    (Student, _invalidate_student_dashboard),
+    (Payment, _invalidate_owner_dashboard),
+    (Application, _invalidate_owner_dashboard),
+    (ReferralCode, _invalidate_redeemer_dashboard),
+    (Job, _invalidate_verifying_dashboard),
+]:
+    post_save.connect(receiver, sender=model, dispatch_uid=f'invalidate_dashboard_{model.__name__}')
+    post_delete.connect(receiver, sender=model, dispatch_uid=f'invalidate_dashboard_deleted_{model.__name__}')
+
+
+def _snapshot_statistics(sender, instance, **kwargs):
+    instance._statistics = statistics.snapshot(instance)
+
+
+def _count_statistics(sender, instance, created, **kwargs):
+    statistics.record_save(instance, getattr(instance, '_statistics', None), created)
+    instance._statistics = statistics.snapshot(instance)
+
+
+def _uncount_statistics(sender, instance, **kwargs):
+    statistics.record_delete(instance, getattr(instance, '_statistics', None))
+
+
+for model in (Application, Payment):
+    post_init.connect(_snapshot_statistics, sender=model, dispatch_uid=f'snapshot_statistics_{model.__name__}')
+    post_save.connect(_count_statistics, sender=model, dispatch_uid=f'count_statistics_{model.__name__}')
+    post_delete.connect(_uncount_statistics, sender=model, dispatch_uid=f'uncount_statistics_{model.__name__}')
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply settings.SQLITE_PRAGMAS to each new SQLite connection"""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+connection_created.connect(configure_sqlite, dispatch_uid='configure_sqlite')
@@ -0,0 +1,169 @@
+"""
+Incrementally maintained admission statistics.
+
+Every application and payment contributes to a handful of
+AdmissionStatistic rows (its course choices, status, submission state,
+payment status and, once paid, the revenue of the day it was made). When
+a row changes, its old contributions are subtracted and its new ones
+added in the same transaction, so the statistics page reads a few dozen
+rows however many applicants there are. `rebuild()` recomputes
+everything from scratch for repair.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import AdmissionStatistic, Application, Payment
+
+APPLICATION_FIELDS = ('first_choice', 'second_choice', 'status', 'is_submitted')
+PAYMENT_FIELDS = ('status', 'amount', 'created_at')
+
+
+def application_contributions(first_choice, second_choice, status, is_submitted, count=1):
+    """{(metric, key): (count, amount)} for `count` applications with these values"""
+    return {
+        ('first_choice', first_choice): (count, 0),
+        ('second_choice', second_choice): (count, 0),
+        ('application_status', status): (count, 0),
+        ('submission', 'submitted' if is_submitted else 'draft'): (count, 0),
+    }
+
+
+def payment_contributions(status, amount, day, count=1):
+    """{(metric, key): (count, amount)} for `count` payments totalling `amount` made on `day`"""
+    contributions = {('payment_status', status): (count, amount)}
+    if status == 'success':
+        contributions[('revenue', day.isoformat())] = (count, amount)
+    return contributions
+
+
+def snapshot(instance):
+    """The statistic-relevant field values of an application or payment, or None if any are deferred"""
+    fields = APPLICATION_FIELDS if isinstance(instance, Application) else PAYMENT_FIELDS
+    values = tuple(instance.__dict__.get(field) for field in fields)
+    return None if None in values else values
+
+
+def contributions(model, values):
+    if values is None:
+        return {}
+    if model is Application:
+        return application_contributions(*values)
+    status, amount, created_at = values
+    return payment_contributions(status, amount, timezone.localdate(created_at))
+
+
+def apply(removed=(), added=()):
+    """Subtract the `removed` contributions and add the `added` ones"""
+    deltas = defaultdict(lambda: [0, Decimal(0)])
+    for sign, group in ((-1, removed), (1, added)):
+        for contribution in group:
+            for key, (count, amount) in contribution.items():
+                deltas[key][0] += sign * count
+                deltas[key][1] += sign * Decimal(amount or 0)
+
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+    with transaction.atomic():
+        for (metric, key), (count, amount) in deltas.items():
+            changes = {'count': F('count') + count, 'amount': F('amount') + amount, 'updated_at': timezone.now()}
+            if not AdmissionStatistic.objects.filter(metric=metric, key=key).update(**changes):
+                AdmissionStatistic.objects.get_or_create(metric=metric, key=key)
+                AdmissionStatistic.objects.filter(metric=metric, key=key).update(**changes)
+
+
+def record_save(instance, previous, created):
+    """Move a saved instance's contributions from `previous` values to its current ones"""
+    model = type(instance)
+    if not created and previous is None:
+        # Old values unknown (deferred fields); rebuild() repairs any drift
+        return
+    apply(removed=[] if created else [contributions(model, previous)], added=[contributions(model, snapshot(instance))])
+
+
+def record_delete(instance, previous):
+    apply(removed=[contributions(type(instance), previous)])
+
+
+def _application_groups(queryset):
+    """[(statistic field values, number of applications)] for `queryset`"""
+    rows = queryset.order_by().values(*APPLICATION_FIELDS).annotate(n=Count('pk'))
+    return [({field: row[field] for field in APPLICATION_FIELDS}, row['n']) for row in rows]
+
+
+def _payment_groups(queryset):
+    """[({status, total amount, day}, number of payments)] for `queryset`"""
+    rows = queryset.order_by().values('status', day=TruncDate('created_at')).annotate(n=Count('pk'), total=Sum('amount'))
+    return [({'status': row['status'], 'amount': row['total'], 'day': row['day']}, row['n']) for row in rows]
+
+
+def _grouped_applications(queryset):
+    for values, count in _application_groups(queryset):
+        yield application_contributions(**values, count=count)
+
+
+def _grouped_payments(queryset):
+    for values, count in _payment_groups(queryset):
+        yield payment_contributions(**values, count=count)
+
+
+def _statistic_changes(changes, fields):
+    """The changes to `fields`, which must be values: the new contributions are worked out from them"""
+    picked = {field: changes[field] for field in fields if field in changes}
+    for field, value in picked.items():
+        if hasattr(value, 'resolve_expression'):
+            raise TypeError(f"The statistics can't follow an expression assigned to {field}.")
+    return picked
+
+
+def update_applications(queryset, **changes):
+    """
+    queryset.update(**changes), keeping the statistics in step; returns the
+    number updated. The selected rows are grouped once, in SQL, before the
+    UPDATE, and their new contributions follow from `changes`.
+    """
+    changed = _statistic_changes(changes, APPLICATION_FIELDS)
+    with transaction.atomic():
+        groups = _application_groups(queryset)
+        updated = queryset.update(**changes)
+        apply(
+            removed=[application_contributions(**values, count=count) for values, count in groups],
+            added=[application_contributions(**{**values, **changed}, count=count) for values, count in groups],
+        )
+    return updated
+
+
+def update_payments(queryset, **changes):
+    """queryset.update(**changes), keeping the statistics in step as update_applications does"""
+    changed = _statistic_changes(changes, PAYMENT_FIELDS)
+    with transaction.atomic():
+        groups = _payment_groups(queryset)
+        updated = queryset.update(**changes)
+        added = []
+        for values, count in groups:
+            values = dict(values, status=changed.get('status', values['status']))
+            if 'amount' in changed:
+                values['amount'] = changed['amount'] * count
+            if 'created_at' in changed:
+                values['day'] = timezone.localdate(changed['created_at'])
+            added.append(payment_contributions(**values, count=count))
+        apply(removed=[payment_contributions(**values, count=count) for values, count in groups], added=added)
+    return updated
+
+
+def record_created(model, instances):
+    """Count instances inserted with bulk_create, which sends no signals"""
+    apply(added=[contributions(model, snapshot(instance)) for instance in instances])
+
+
+def rebuild():
+    """Recompute every statistic from the application and payment tables"""
+    with transaction.atomic():
+        AdmissionStatistic.objects.all().delete()
+        apply(added=list(_grouped_applications(Application.objects.all())) + list(_grouped_payments(Payment.objects.all())))
+    return AdmissionStatistic.objects.count()
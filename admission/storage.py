@@ -0,0 +1,105 @@
+"""
+Content-addressed storage for applicant uploads.
+
+Files are named after the SHA-256 of their bytes, so a byte-identical
+upload is stored once no matter how many documents or passports point at
+it, and saving it again skips the write. `StoredFile` rows count how many
+model fields reference each file; files whose count drops to zero are
+removed by the `gc_media` command after a grace period rather than at
+once, so an upload racing a release can never lose its file.
+"""
+import hashlib
+import os
+import posixpath
+from collections import Counter
+
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+CONTENT_PREFIX = 'cas'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage that names every file by the hash of its content"""
+
+    def hashed_name(self, digest, extension):
+        """The name of content whose SHA-256 hex digest is `digest`"""
+        return posixpath.join(CONTENT_PREFIX, digest[:2], digest[2:4], f'{digest}{extension.lower()}')
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        return self.hashed_name(digest.hexdigest(), os.path.splitext(name)[1])
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        if self.exists(name):
+            # Refresh the mtime so gc_media's grace period covers the reuse
+            os.utime(self.path(name))
+            return name
+        saved = super()._save(name, content)
+        if saved != name:
+            # A concurrent upload of the same bytes won the race
+            self.delete(saved)
+        return name
+
+    def adopt(self, path, digest, extension):
+        """
+        Move the local file `path`, already hashed to `digest`, into the
+        store by renaming it rather than copying its bytes; `path` must be
+        on the same file system as the store. Returns the stored name.
+        """
+        name = self.hashed_name(digest, extension)
+        target = self.path(name)
+        if os.path.exists(target):
+            os.utime(target)
+            os.remove(path)
+            return name
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(path, self.file_permissions_mode)
+        # Atomic, and a concurrent adoption of the same bytes leaves identical content
+        os.replace(path, target)
+        return name
+
+
+content_storage = ContentAddressedStorage()
+
+
+def retain(names):
+    """Record one more reference to each stored file in `names` (repeats count)"""
+    from .models import StoredFile
+
+    for name, count in Counter(filter(None, names)).items():
+        if not StoredFile.objects.filter(name=name).update(
+            references=F('references') + count, updated_at=timezone.now()
+        ):
+            stored, created = StoredFile.objects.get_or_create(
+                name=name, defaults={'references': count, 'size': _size(name)}
+            )
+            if not created:
+                StoredFile.objects.filter(pk=stored.pk).update(
+                    references=F('references') + count, updated_at=timezone.now()
+                )
+
+
+def release(names):
+    """Drop one reference to each stored file in `names` (repeats count)"""
+    from .models import StoredFile
+
+    for name, count in Counter(filter(None, names)).items():
+        StoredFile.objects.filter(name=name).update(
+            references=Greatest(F('references') - count, 0), updated_at=timezone.now()
+        )
+
+
+def _size(name):
+    try:
+        return content_storage.size(name)
+    except OSError:
+        return 0
@@ -0,0 +1,12 @@
+"""`{{ form|crispy_cached }}`: the `|crispy` filter, with blank forms' markup cached"""
+from crispy_forms.templatetags.crispy_forms_filters import as_crispy_form
+from django import template
+
+from admission.caching import cached_form_html
+
+register = template.Library()
+
+
+@register.filter
+def crispy_cached(form):
+    return cached_form_html(form, as_crispy_form)
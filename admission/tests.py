@@ -0,0 +1,840 @@
+import datetime
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from importlib import import_module
+from io import BytesIO, StringIO
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from .assets import BUILD_OUTPUTS, _rebase_urls, _strip_comments, parse, purge, serialize
+from .budgets import ADMIN_CHANGELISTS, PUBLIC_PAGES, QUERY_BUDGETS, section_posts, shared_cache_settings
+from .caching import cached_form_html
+from .checks import check_built_assets
+from .forms import ApplicationPersonalInfoForm, StudentRegistrationForm
+from .models import (
+    AdmissionStatistic, Application, ApplicationSequence, Job, Payment, PaystackEvent, ReferralCode, SchoolAttended, SSCEResult,
+    StoredFile, Student, UploadedDocument, UploadSession,
+)
+from .payments import VERIFY_PAYMENT
+from .seed import next_applicant_number, seed_admissions
+from .statistics import rebuild, update_applications, update_payments
+from .uploads import UPLOAD_DIR, expire_uploads, part_path, receive_chunk, start_upload
+
+# Password hashing is beside the point in these tests and dominates their run time
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+# Pages render without collectstatic's manifest
+UNHASHED_STATIC = {**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}}
+
+
+def run_in_threads(work, chunks):
+    """Run `work(chunk)` for each chunk on its own thread and connection; returns the exceptions raised"""
+    errors = []
+
+    def target(chunk):
+        try:
+            work(chunk)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=target, args=(chunk,)) for chunk in chunks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+class ApplicationNumberConcurrencyTests(TransactionTestCase):
+    """Application numbers handed out by ApplicationSequence to concurrent first saves"""
+
+    THREADS = 8
+    APPLICATIONS = 2000
+
+    def test_concurrent_saves_get_every_number_once(self):
+        users = User.objects.bulk_create([User(username=f'applicant{i}') for i in range(self.APPLICATIONS)])
+        students = Student.objects.bulk_create([Student(user=user, phone='+2348000000000') for user in users])
+
+        def create(chunk):
+            for student in chunk:
+                Application.objects.create(student=student)
+
+        errors = run_in_threads(create, [students[i::self.THREADS] for i in range(self.THREADS)])
+        self.assertEqual(errors, [])
+
+        year = timezone.now().year
+        numbers = sorted(
+            int(number.rsplit('/', 1)[1])
+            for number in Application.objects.values_list('application_number', flat=True)
+        )
+        self.assertEqual(numbers, list(range(1, self.APPLICATIONS + 1)))
+        self.assertEqual(ApplicationSequence.objects.get(year=year).last_number, self.APPLICATIONS)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, STORAGES=UNHASHED_STATIC)
+class ReferralCodeConcurrencyTests(TransactionTestCase):
+    """Registrations racing for the same referral codes"""
+
+    THREADS = 8
+    CODES = 5
+
+    def test_each_code_is_claimed_exactly_once(self):
+        codes = [ReferralCode.objects.create(code=f'RACE{i:04d}').code for i in range(self.CODES)]
+
+        def register(thread):
+            client = Client()
+            for code in codes:
+                client.post('/register/', {
+                    'username': f'racer{thread}-{code}', 'first_name': 'Race', 'last_name': 'Runner',
+                    'email': f'racer{thread}-{code}@example.com', 'phone': '+2348000000000',
+                    'password1': 'a-long-passphrase-42', 'password2': 'a-long-passphrase-42',
+                    'referral_code': code,
+                }, secure=True)
+                client.logout()
+
+        errors = run_in_threads(register, range(self.THREADS))
+        self.assertEqual(errors, [])
+
+        for code in ReferralCode.objects.select_related('used_by', 'student'):
+            self.assertTrue(code.is_used, code.code)
+            self.assertIsNotNone(code.used_at, code.code)
+            self.assertEqual(code.student.user, code.used_by, code.code)
+            self.assertTrue(code.student.can_apply, code.code)
+        # A registrant who lost the race is rolled back whole
+        self.assertEqual(User.objects.count(), self.CODES)
+        self.assertEqual(Student.objects.count(), self.CODES)
+
+
+class ReferralCodeTests(TestCase):
+    """Referral codes are generated to the count asked for and redeemed however they are typed"""
+
+    def test_generation_makes_up_for_dropped_codes(self):
+        dropped = []
+        columns = len(ReferralCode._meta.concrete_fields) - 1
+
+        def duplicate_a_code(execute, sql, params, many, context):
+            # As if another process had inserted the second code first: the bulk insert ignores it
+            if not dropped and sql.startswith('INSERT') and '"admission_referralcode"' in sql:
+                params = list(params)
+                dropped.append(params[columns])
+                params[columns] = params[0]
+            return execute(sql, params, many, context)
+
+        out = StringIO()
+        with connection.execute_wrapper(duplicate_a_code):
+            call_command('generate_referral_codes', '50', '--batch-size', '20', stdout=out)
+
+        self.assertFalse(ReferralCode.objects.filter(code__in=dropped).exists())
+        self.assertEqual(ReferralCode.objects.count(), 50)
+        self.assertIn('Successfully generated 50 referral codes', out.getvalue())
+
+    def test_codes_are_matched_in_upper_case(self):
+        code = ReferralCode.objects.create(code='abcd1234')
+        self.assertEqual(ReferralCode.objects.get(pk=code.pk).code, 'ABCD1234')
+
+        form = StudentRegistrationForm({'referral_code': ' abcd1234 '})
+        form.is_valid()
+        self.assertEqual(form.cleaned_data['referral_code'], code)
+
+
+class PaystackStub(BaseHTTPRequestHandler):
+    """
+    Answers GET /transaction/verify/<reference> like Paystack would. Each
+    reference has a list of (HTTP status, body) answers, used in turn.
+    """
+
+    answers = {}
+    requests = []
+
+    def do_GET(self):
+        reference = self.path.rsplit('/', 1)[-1]
+        self.requests.append((reference, self.headers.get('Authorization')))
+        status, body = self.answers[reference].pop(0)
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def charge(reference, status='success', amount=None):
+    """A Paystack verification answer for `reference`"""
+    amount = settings.APPLICATION_FEE_KOBO if amount is None else amount
+    return 200, {'status': True, 'data': {'reference': reference, 'status': status, 'amount': amount}}
+
+
+@override_settings(PAYSTACK_SECRET_KEY='sk_test_stub', PAYSTACK_VERIFY_DELAY=0, STORAGES=UNHASHED_STATIC)
+class PaystackVerificationTests(TestCase):
+    """The payment callback queues verification, and the worker settles it against a local Paystack stub"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), PaystackStub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.api_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        PaystackStub.answers = {}
+        PaystackStub.requests = []
+        override = override_settings(PAYSTACK_API_URL=self.api_url)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user('payer', password='x', first_name='Pay', last_name='Er')
+        self.student = Student.objects.create(user=self.user, phone='+2348000000000')
+        self.payment = Payment.objects.create(
+            student=self.student, reference='ref-1', amount=settings.APPLICATION_FEE
+        )
+        self.client.force_login(self.user)
+
+    def callback(self):
+        return self.client.get('/payment/callback/', {'reference': self.payment.reference}, secure=True)
+
+    def process_jobs(self):
+        call_command('process_jobs', '--once', stdout=StringIO(), stderr=StringIO())
+
+    def assert_settled(self, payment_status, can_apply):
+        self.payment.refresh_from_db()
+        self.student.refresh_from_db()
+        self.assertEqual(self.payment.status, payment_status)
+        self.assertEqual(self.student.can_apply, can_apply)
+        self.assertEqual(self.student.has_paid, can_apply)
+
+    def test_callback_queues_verification_without_calling_paystack(self):
+        response = self.callback()
+
+        self.assertRedirects(response, '/dashboard/', fetch_redirect_response=False)
+        self.assertEqual(PaystackStub.requests, [])
+        job = Job.objects.get(kind=VERIFY_PAYMENT)
+        self.assertEqual((job.key, job.status), ('ref-1', 'queued'))
+        self.assertTrue(self.client.get('/dashboard/', secure=True).context['verifying'])
+        # A repeated callback reuses the queued job
+        self.callback()
+        self.assertEqual(Job.objects.filter(kind=VERIFY_PAYMENT).count(), 1)
+
+    def test_successful_charge_unlocks_the_application(self):
+        PaystackStub.answers['ref-1'] = [charge('ref-1')]
+        self.callback()
+        self.process_jobs()
+
+        self.assertEqual(PaystackStub.requests, [('ref-1', 'Bearer sk_test_stub')])
+        self.assert_settled('success', True)
+        self.assertEqual(Job.objects.get(kind=VERIFY_PAYMENT).status, 'done')
+        self.assertFalse(self.client.get('/dashboard/', secure=True).context['verifying'])
+
+    def test_failed_or_short_charge_fails_the_payment(self):
+        for status, amount in [('failed', None), ('success', settings.APPLICATION_FEE_KOBO - 100)]:
+            with self.subTest(status=status, amount=amount):
+                Payment.objects.filter(pk=self.payment.pk).update(status='pending')
+                Job.objects.all().delete()
+                PaystackStub.answers['ref-1'] = [charge('ref-1', status, amount)]
+                self.callback()
+                self.process_jobs()
+
+                self.assert_settled('failed', False)
+                self.assertEqual(Job.objects.get(kind=VERIFY_PAYMENT).status, 'done')
+
+    def test_paystack_outage_is_retried(self):
+        PaystackStub.answers['ref-1'] = [(503, {'status': False}), charge('ref-1')]
+        self.callback()
+        with self.assertLogs('admission.jobs', 'ERROR'):
+            self.process_jobs()
+
+        job = Job.objects.get(kind=VERIFY_PAYMENT)
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn('HTTP 503', job.last_error)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assert_settled('pending', False)
+
+        # Once the backoff has passed, the next run settles the payment
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.process_jobs()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('done', 2))
+        self.assert_settled('success', True)
+        self.assertEqual(len(PaystackStub.requests), 2)
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Every page and admin changelist stays within its query budget on a
+    seeded dataset; the subclasses repeat the checks on larger ones, so a
+    query count that grows with the rows fails.
+    """
+
+    APPLICANTS = 10
+
+    @classmethod
+    def setUpClass(cls):
+        # Budgets assume a deployment with a cache shared by every process
+        media_root = cls.enterClassContext(tempfile.TemporaryDirectory())
+        cache_dir = cls.enterClassContext(tempfile.TemporaryDirectory())
+        cls.enterClassContext(override_settings(
+            MEDIA_ROOT=media_root, STORAGES=UNHASHED_STATIC, **shared_cache_settings(cache_dir)
+        ))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_admissions(cls.APPLICANTS)
+        cls.staff = User.objects.create_superuser('budget-admin', 'admin@example.com', 'budget-admin')
+        cls.application = Application.objects.filter(is_submitted=False).select_related('student__user').first()
+
+    def setUp(self):
+        # Cached pages and dashboards would outlive the rolled-back rows they were built from
+        cache.clear()
+        self.anonymous = Client()
+        self.student = Client()
+        self.student.force_login(self.application.student.user)
+        self.admin = Client()
+        self.admin.force_login(self.staff)
+
+    def assert_within_budget(self, name, client, method, url, data=None):
+        """Request `url` once to warm the caches, then hold the repeated request to its budget"""
+        def request():
+            payload = data() if callable(data) else data
+            response = getattr(client, method)(url, payload, secure=True)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            self.assertLess(response.status_code, 400, f'{method.upper()} {url}')
+
+        request()
+        with self.subTest(name), self.assertNumQueries(QUERY_BUDGETS[name]):
+            request()
+
+    def test_public_pages(self):
+        for name, url in PUBLIC_PAGES.items():
+            self.assert_within_budget(name, self.anonymous, 'get', url)
+
+    def test_student_pages(self):
+        self.assert_within_budget('dashboard', self.student, 'get', '/dashboard/')
+        self.assert_within_budget('application_form GET', self.student, 'get', '/application/')
+        self.assert_within_budget('application PDF', self.student, 'get', '/application/pdf/')
+        self.assert_within_budget('passport photo', self.student, 'get', self.application.passport_photo.url)
+
+    def test_application_form_posts(self):
+        for section, data in section_posts(self.application).items():
+            self.assert_within_budget(f'application_form POST {section}', self.student, 'post', '/application/', data)
+
+    def test_admin_changelists(self):
+        for name, url in ADMIN_CHANGELISTS.items():
+            self.assert_within_budget(name, self.admin, 'get', url)
+
+
+class QueryBudget100Tests(QueryBudgetTests):
+    APPLICANTS = 100
+
+
+class QueryBudget1000Tests(QueryBudgetTests):
+    APPLICANTS = 1000
+
+
+@override_settings(STORAGES=UNHASHED_STATIC)
+class SectionAutosaveTests(TestCase):
+    """Autosaving sections of the application form"""
+
+    def setUp(self):
+        user = User.objects.create_user('autosaver', password='x', first_name='Auto', last_name='Saver')
+        student = Student.objects.create(user=user, phone='+2348000000000', can_apply=True)
+        self.application = Application.objects.create(student=student, first_name='Auto', surname='Saver')
+        self.client.force_login(user)
+
+    def test_personal_section_saves_before_the_passport_is_uploaded(self):
+        response = self.client.post('/application/sections/personal/', {
+            'first_name': 'Auto', 'surname': 'Saver', 'other_name': '', 'date_of_birth': '2001-02-03',
+            'phone': '+2348000000000', 'email': 'auto@example.com', 'address': 'Hadejia',
+            'lga': 'Hadejia', 'state_of_origin': 'Jigawa',
+        }, secure=True)
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(response.json()['saved'])
+        self.application.refresh_from_db()
+        self.assertEqual(self.application.lga, 'Hadejia')
+        self.assertFalse(self.application.passport_photo)
+
+    def test_submission_still_requires_the_passport(self):
+        Application.objects.filter(pk=self.application.pk).update(declaration_text='I declare.')
+        self.client.post('/application/', {'section': 'submit'}, secure=True)
+
+        self.application.refresh_from_db()
+        self.assertFalse(self.application.is_submitted)
+
+
+@override_settings(STORAGES=UNHASHED_STATIC)
+class AnonymousPageCacheTests(TestCase):
+    """Public pages are rendered once for anonymous visitors"""
+
+    def setUp(self):
+        cache.clear()
+
+    def rendered(self, url):
+        # A cache hit is returned without rendering a template
+        return bool(self.client.get(url, secure=True).templates)
+
+    def test_page_is_cached_by_path(self):
+        self.assertTrue(self.rendered('/about/'))
+        self.assertFalse(self.rendered('/about/'))
+
+    def test_query_strings_bypass_the_cache(self):
+        for _ in range(2):
+            self.assertTrue(self.rendered('/about/?utm_source=newsletter'))
+        # Nor did they fill the cache for the bare path
+        self.assertTrue(self.rendered('/about/'))
+
+
+class FormMarkupCacheTests(TestCase):
+    """Which forms' rendered markup may be cached"""
+
+    def setUp(self):
+        cache.clear()
+        self.renders = []
+
+    def render(self, form):
+        self.renders.append(type(form).__name__)
+        return f'<form>{type(form).__name__}</form>'
+
+    def test_blank_registration_form_is_rendered_once(self):
+        for _ in range(2):
+            html = cached_form_html(StudentRegistrationForm(), self.render)
+        self.assertEqual(html, '<form>StudentRegistrationForm</form>')
+        self.assertEqual(self.renders, ['StudentRegistrationForm'])
+
+    def test_forms_with_applicant_data_are_never_cached(self):
+        user = User.objects.create_user('cached', password='x')
+        student = Student.objects.create(user=user, phone='+2348000000000')
+        application = Application.objects.create(student=student, first_name='Private', surname='Person')
+        forms = [
+            ApplicationPersonalInfoForm(instance=application),
+            StudentRegistrationForm(initial={'email': 'private@example.com'}),
+            StudentRegistrationForm({'username': 'private'}),
+        ]
+        for form in forms:
+            cached_form_html(form, self.render)
+            cached_form_html(form, self.render)
+        self.assertEqual(len(self.renders), 2 * len(forms))
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _jpeg(size=(600, 800)):
+    output = BytesIO()
+    Image.effect_noise(size, 80).convert('RGB').save(output, 'JPEG', quality=95)
+    return output.getvalue()
+
+
+class StatisticsUpdateTests(TestCase):
+    """Bulk updates keep the admission statistics as a full rebuild would count them"""
+
+    def setUp(self):
+        students = Student.objects.bulk_create([
+            Student(user=user, phone='+2348000000000')
+            for user in User.objects.bulk_create([User(username=f'counted{i}') for i in range(6)])
+        ])
+        for index, student in enumerate(students):
+            Application.objects.create(
+                student=student, first_choice=['diploma_xray', 'diploma_nutrition'][index % 2],
+                status=['pending', 'approved'][index % 3 == 0],
+            )
+            Payment.objects.create(
+                student=student, reference=f'counted-{index}', amount=settings.APPLICATION_FEE,
+                status=['pending', 'failed', 'success'][index % 3],
+            )
+
+    def counts(self):
+        return set(AdmissionStatistic.objects.exclude(count=0, amount=0).values_list('metric', 'key', 'count', 'amount'))
+
+    def test_updates_match_a_rebuild(self):
+        with CaptureQueriesContext(connection) as queries:
+            update_applications(Application.objects.filter(status='pending'), status='approved', is_submitted=True)
+        # One GROUP BY and the UPDATE itself; the selected rows never come back to Python
+        self.assertEqual(len([query for query in queries if '"admission_application"' in query['sql']]), 2)
+        update_payments(Payment.objects.exclude(status='success'), status='success', amount=1000)
+        update_payments(Payment.objects.filter(reference='counted-0'), created_at=timezone.now() - datetime.timedelta(days=3))
+
+        counted = self.counts()
+        rebuild()
+        self.assertEqual(counted, self.counts())
+        self.assertIn(('application_status', 'approved', 6, 0), counted)
+
+    def test_expressions_are_refused(self):
+        with self.assertRaises(TypeError):
+            update_payments(Payment.objects.all(), amount=F('amount') * 2)
+
+
+@override_settings(STORAGES=UNHASHED_STATIC, UPLOAD_CHUNK_BYTES=4096)
+class ChunkedUploadTests(TestCase):
+    """Resumable uploads: chunks land at the server's offset, intact, and finish in content-addressed storage"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        override = override_settings(MEDIA_ROOT=media_root.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user('uploader', password='x', first_name='Up', last_name='Loader')
+        self.student = Student.objects.create(user=self.user, phone='+2348000000000', can_apply=True)
+        self.application = Application.objects.create(student=self.student, first_name='Up', surname='Loader')
+        self.client.force_login(self.user)
+        self.pdf = b'%PDF-1.4\n' + os.urandom(10000)
+
+    def start(self, data, **details):
+        details.setdefault('size', len(data))
+        response = self.client.post(
+            '/application/uploads/', json.dumps(details), content_type='application/json', secure=True
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['url']
+
+    def patch(self, url, offset, chunk, chunk_sha256=None):
+        headers = {'HTTP_UPLOAD_OFFSET': str(offset)}
+        if chunk_sha256:
+            headers['HTTP_UPLOAD_CHUNK_SHA256'] = chunk_sha256
+        return self.client.generic(
+            'PATCH', url, chunk, content_type='application/offset+octet-stream', secure=True, **headers
+        )
+
+    def upload(self, data, **details):
+        """Send `data` in whole chunks; returns the last response"""
+        url = self.start(data, **details)
+        for offset in range(0, len(data), settings.UPLOAD_CHUNK_BYTES):
+            chunk = data[offset:offset + settings.UPLOAD_CHUNK_BYTES]
+            response = self.patch(url, offset, chunk, _sha256(chunk))
+        return response
+
+    def test_document_in_chunks(self):
+        url = self.start(self.pdf, purpose='document', document_type='birth_cert', filename='cert.pdf',
+                         sha256=_sha256(self.pdf))
+        first = self.pdf[:4096]
+
+        # A chunk must start where the upload has got to
+        response = self.patch(url, 5, self.pdf[5:4096])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual((response.json()['offset'], response.json()['complete']), (0, False))
+
+        # A damaged chunk is dropped, and the client sends it again
+        response = self.patch(url, 0, first, _sha256(b'something else'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'The chunk did not arrive intact; send it again.', 'offset': 0})
+        self.assertEqual(os.path.getsize(part_path(UploadSession.objects.get())), 0)
+
+        for offset in range(0, len(self.pdf), 4096):
+            chunk = self.pdf[offset:offset + 4096]
+            response = self.patch(url, offset, chunk, _sha256(chunk))
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(response.json()['complete'])
+
+        document = UploadedDocument.objects.get(application=self.application)
+        with document.document.open('rb') as stored:
+            self.assertEqual(stored.read(), self.pdf)
+        self.assertEqual(StoredFile.objects.get(name=document.document.name).references, 1)
+        self.assertEqual(os.listdir(os.path.join(settings.MEDIA_ROOT, UPLOAD_DIR)), [])
+        # The client's progress query still finds the finished upload
+        self.assertTrue(self.client.get(url, secure=True).json()['complete'])
+
+    def test_dropped_connection_keeps_what_arrived(self):
+        session = start_upload(self.student, 'document', 'cert.pdf', len(self.pdf), document_type='birth_cert')
+        # Without a chunk checksum, the bytes before the connection dropped are kept
+        receive_chunk(session, 0, BytesIO(self.pdf[:1000]), 4096)
+        self.assertEqual(session.received, 1000)
+        self.assertEqual(UploadSession.objects.get().received, 1000)
+
+        # With one, a short chunk is dropped whole
+        receive_chunk(session, 1000, BytesIO(self.pdf[1000:2000]), 4096, _sha256(self.pdf[1000:5096]))
+        self.assertEqual(UploadSession.objects.get().received, 1000)
+        self.assertEqual(os.path.getsize(part_path(session)), 1000)
+
+        receive_chunk(session, 1000, BytesIO(self.pdf[1000:5096]), 4096)
+        with open(part_path(session), 'rb') as part:
+            self.assertEqual(part.read(), self.pdf[:5096])
+
+    def test_file_type_is_sniffed_from_its_content(self):
+        executable = b'MZ' + os.urandom(98)
+        url = self.start(executable, purpose='document', document_type='birth_cert', filename='cert.pdf')
+        session = UploadSession.objects.get()
+
+        response = self.patch(url, 0, executable)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], "This type of file can't be uploaded here.")
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(os.path.exists(part_path(session)))
+
+    def test_identical_uploads_share_one_file(self):
+        for document_type in ['birth_cert', 'primary_cert']:
+            response = self.upload(self.pdf, purpose='document', document_type=document_type, filename='cert.pdf')
+            self.assertTrue(response.json()['complete'])
+
+        names = set(UploadedDocument.objects.values_list('document', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertEqual(dict(StoredFile.objects.values_list('name', 'references')), {names.pop(): 2})
+
+    def test_truncated_passport(self):
+        truncated = _jpeg()[:20000]
+
+        # A small photo is decoded before it is attached
+        with override_settings(PASSPORT_INLINE_MAX_BYTES=len(truncated)):
+            response = self.upload(truncated, purpose='passport', filename='me.jpg')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UploadSession.objects.exists())
+        self.application.refresh_from_db()
+        self.assertFalse(self.application.passport_photo)
+
+        # A larger one passes its header check and is rejected by the background job
+        with override_settings(PASSPORT_INLINE_MAX_BYTES=len(truncated) - 1):
+            response = self.upload(truncated, purpose='passport', filename='me.jpg')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.application.refresh_from_db()
+        self.assertTrue(self.application.passport_photo)
+        with self.assertLogs('admission.images', 'WARNING'):
+            call_command('process_jobs', '--once', stdout=StringIO(), stderr=StringIO())
+        self.application.refresh_from_db()
+        self.assertFalse(self.application.passport_photo)
+
+    def test_expire_uploads(self):
+        stale = start_upload(self.student, 'document', 'cert.pdf', 100, document_type='birth_cert')
+        live = start_upload(self.student, 'passport', 'me.jpg', 100)
+        orphan = os.path.join(settings.MEDIA_ROOT, UPLOAD_DIR, 'orphan.part')
+        open(orphan, 'wb').close()
+        before = timezone.now() + datetime.timedelta(seconds=1)
+        os.utime(orphan, (0, 0))
+        os.utime(part_path(stale), (0, 0))
+        UploadSession.objects.filter(pk=live.pk).update(updated_at=before)
+
+        self.assertEqual(expire_uploads(before, dry_run=True), 2)
+        self.assertEqual(UploadSession.objects.count(), 2)
+        self.assertEqual(expire_uploads(before), 2)
+        self.assertEqual(list(UploadSession.objects.values_list('pk', flat=True)), [live.pk])
+        self.assertEqual(os.listdir(os.path.join(settings.MEDIA_ROOT, UPLOAD_DIR)), [f'{live.pk}.part'])
+
+
+class LegacyMediaMigrationTests(TestCase):
+    """Migration 0011 moves files saved before content-addressed storage under cas/"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        override = override_settings(MEDIA_ROOT=media_root.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.media_root = media_root.name
+
+    def legacy_file(self, name, content):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as legacy:
+            legacy.write(content)
+        return name
+
+    def test_duplicates_collapse_into_one_counted_file(self):
+        photo = b'\xff\xd8\xff legacy passport'
+        applications = []
+        for number in range(3):
+            user = User.objects.create_user(f'legacy{number}', password='x')
+            student = Student.objects.create(user=user, phone='+2348000000000')
+            application = Application.objects.create(student=student)
+            # Saved by the old storage, which wrote a copy per upload; update() leaves the counts alone
+            Application.objects.filter(pk=application.pk).update(
+                passport_photo=self.legacy_file(f'passports/{user.pk}/ADAMU.jpeg', photo)
+            )
+            applications.append(application)
+        UploadedDocument.objects.bulk_create([
+            UploadedDocument(application=applications[0], document_type='birth_cert',
+                             document=self.legacy_file('documents/5/form.pdf', b'%PDF-1.4 form')),
+            UploadedDocument(application=applications[1], document_type='birth_cert',
+                             document=self.legacy_file('documents/5/form_u2UVfz9.pdf', b'%PDF-1.4 form')),
+            UploadedDocument(application=applications[2], document_type='birth_cert', document='documents/5/gone.pdf'),
+        ])
+
+        import_module('admission.migrations.0011_rehash_legacy_media').rehash_legacy_media(django_apps, None)
+
+        passports = set(Application.objects.values_list('passport_photo', flat=True))
+        self.assertEqual(len(passports), 1)
+        passport = passports.pop()
+        self.assertTrue(passport.startswith('cas/'))
+        with open(os.path.join(self.media_root, passport), 'rb') as stored:
+            self.assertEqual(stored.read(), photo)
+        documents = UploadedDocument.objects.order_by('pk').values_list('document', flat=True)
+        self.assertEqual(documents[0], documents[1])
+        # A row whose file is missing keeps its name
+        self.assertEqual(documents[2], 'documents/5/gone.pdf')
+        self.assertEqual(
+            dict(StoredFile.objects.values_list('name', 'references')), {passport: 3, documents[0]: 2}
+        )
+
+
+class AssetPurgeTests(SimpleTestCase):
+    """build_assets keeps the CSS rules the templates use and rebases what it moves"""
+
+    def purged(self, css, tokens):
+        rules, _ = parse(_strip_comments(css))
+        return serialize(purge(rules, tokens))
+
+    def test_unused_rules_and_empty_groups_are_dropped(self):
+        css = (
+            '.btn{color:red}.unused{color:blue}'
+            '@media (min-width:768px){.btn{display:block}.unused{display:none}'
+            '@supports (display:grid){.row{display:grid}.gone{display:none}}}'
+            '@media print{.unused{display:none}}'
+        )
+        self.assertEqual(
+            self.purged(css, {'btn', 'row'}),
+            '.btn{color:red}@media (min-width:768px){.btn{display:block}@supports (display:grid){.row{display:grid}}}',
+        )
+
+    def test_other_at_rules_are_kept_whole(self):
+        css = (
+            '@charset "UTF-8";'
+            '@font-face{font-family:"X";src:url(../fonts/x.woff2) format("woff2")}'
+            '@keyframes spin{from{transform:rotate(0)}to{transform:rotate(360deg)}}'
+        )
+        self.assertEqual(self.purged(css, set()), css)
+
+    def test_selectors(self):
+        css = (
+            '.btn,.nope{margin:0}'
+            '.btn:not(.unused){padding:0}'
+            '.unused:is(.btn){padding:1px}'
+            '.row>.col-md-6{width:50%}'
+            '.row>.missing{width:1%}'
+            '[class*="col-"]{flex:1}'
+        )
+        # Classes inside :not() and :is() don't have to be used for the rule to apply
+        self.assertEqual(
+            self.purged(css, {'btn', 'row', 'col-md-6'}),
+            '.btn{margin:0}.btn:not(.unused){padding:0}.row>.col-md-6{width:50%}[class*="col-"]{flex:1}',
+        )
+
+    def test_comments(self):
+        self.assertEqual(
+            _strip_comments('/* licence */.a{color:red/* inline */}.b::after{content:"/* kept */ }"}'),
+            '.a{color:red}.b::after{content:"/* kept */ }"}',
+        )
+        self.assertEqual(
+            self.purged('.b::after{content:"/* kept */ }"}.c{color:red}', {'b'}), '.b::after{content:"/* kept */ }"}'
+        )
+
+    def test_urls_are_rebased_to_the_bundle(self):
+        css = (
+            'a{src:url(../webfonts/fa.woff2) url("../webfonts/fa.ttf")'
+            ' url(data:image/png;base64,AA) url(/abs.png) url(https://x.y/z.png) url(#icon)}'
+        )
+        self.assertEqual(
+            _rebase_urls(css, 'vendor/fontawesome/css/all.min.css', 'css/vendor.css'),
+            'a{src:url(../vendor/fontawesome/webfonts/fa.woff2) url(../vendor/fontawesome/webfonts/fa.ttf)'
+            ' url(data:image/png;base64,AA) url(/abs.png) url(https://x.y/z.png) url(#icon)}',
+        )
+
+    def test_check_requires_the_build(self):
+        with tempfile.TemporaryDirectory() as static_dir, override_settings(STATICFILES_DIRS=[static_dir]):
+            with override_settings(REQUIRE_BUILT_ASSETS=True):
+                self.assertEqual([error.id for error in check_built_assets(None)], ['admission.E001'])
+            with override_settings(REQUIRE_BUILT_ASSETS=False):
+                self.assertEqual([error.id for error in check_built_assets(None)], ['admission.W001'])
+            for name in BUILD_OUTPUTS:
+                os.makedirs(os.path.dirname(os.path.join(static_dir, name)), exist_ok=True)
+                open(os.path.join(static_dir, name), 'w').close()
+            with override_settings(REQUIRE_BUILT_ASSETS=True):
+                self.assertEqual(check_built_assets(None), [])
+
+
+class SeedAdmissionsCommandTests(TestCase):
+    """seed_admissions creates accounts with a shared, published password"""
+
+    def test_refused_with_debug_off(self):
+        with self.assertRaisesMessage(CommandError, '--force'):
+            call_command('seed_admissions', '1', stdout=StringIO(), stderr=StringIO())
+        self.assertFalse(User.objects.exists())
+
+    def test_forced_or_with_debug_on(self):
+        for args, debug in [(['--force'], False), ([], True)]:
+            with self.subTest(args=args, debug=debug), tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(MEDIA_ROOT=media_root, DEBUG=debug):
+                call_command('seed_admissions', '1', *args, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Student.objects.count(), 2)
+
+    def test_numbering_continues_after_the_highest_applicant(self):
+        User.objects.bulk_create([User(username=name) for name in ['applicant9', 'applicant10', 'applicants']])
+        self.assertEqual(next_applicant_number(), 11)
+
+
+def _this_year():
+    return timezone.now().year
+
+
+def _last_week():
+    now = timezone.now()
+    return {'created_at__gte': now - datetime.timedelta(days=7), 'created_at__lt': now}
+
+
+# The portal's hot queries, in the shape the views, admin and workers send them
+HOT_QUERIES = {
+    'pending payment for student': lambda: Payment.objects.filter(student_id=1, status='pending').order_by('pk')[:1],
+    'payment by reference': lambda: Payment.objects.filter(reference='ref'),
+    'admin payments by status': lambda: Payment.objects.filter(status='success').order_by('-pk')[:100],
+    'admin payments by date': lambda: Payment.objects.filter(**_last_week()).order_by('-pk')[:100],
+    'application for student': lambda: Application.objects.filter(student_id=1),
+    'admin applications by status': lambda: Application.objects.filter(status='pending').order_by('-pk')[:100],
+    'admin applications by submission': lambda: Application.objects.filter(is_submitted=True).order_by('-pk')[:100],
+    'admin applications by first choice':
+        lambda: Application.objects.filter(first_choice='diploma_xray').order_by('-pk')[:100],
+    'admin applications by date': lambda: Application.objects.filter(**_last_week()).order_by('-pk')[:100],
+    'admin applications by status and date':
+        lambda: Application.objects.filter(status='approved', **_last_week()).order_by('-pk')[:100],
+    'applications this year': lambda: Application.objects.filter(created_at__year=_this_year()).values('pk'),
+    'unused referral codes': lambda: ReferralCode.objects.filter(is_used=False).order_by('-pk')[:100],
+    'redeem referral code': lambda: ReferralCode.objects.filter(code='ABCD1234', is_used=False),
+    'schools for application': lambda: SchoolAttended.objects.filter(application_id=1),
+    'SSCE results for application': lambda: SSCEResult.objects.filter(application_id=1),
+    'existing document': lambda: UploadedDocument.objects.filter(application_id=1, document_type='birth_cert'),
+    'due jobs': lambda: Job.objects.filter(status='queued', run_after__lte=timezone.now()).order_by('run_after', 'pk')[:10],
+    'active job for key':
+        lambda: Job.objects.filter(kind='verify_payment', key='ref', status__in=['queued', 'running']),
+    'unsettled Paystack events':
+        lambda: PaystackEvent.objects.filter(processed_at__isnull=True).order_by('pk')[:100],
+    'stored file by name': lambda: StoredFile.objects.filter(name='cas/ab/cd/abcd.pdf'),
+}
+
+
+# "SCAN table" without "USING ... INDEX" reads every row of the table
+FULL_SCAN_RE = re.compile(r'\bSCAN (\w+)(?!\w| USING)')
+
+
+class QueryPlanTests(TestCase):
+    """The hot queries are answered from an index, never a full table scan"""
+
+    def test_hot_queries_use_an_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plans are only checked on SQLite.')
+        for name, query in HOT_QUERIES.items():
+            with self.subTest(name):
+                plan = query().explain()
+                self.assertEqual(FULL_SCAN_RE.findall(plan), [], f'{name}:\n{plan}')
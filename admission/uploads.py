@@ -0,0 +1,361 @@
+"""
+Chunked, resumable uploads of passport photographs and documents.
+
+The client opens an UploadSession announcing the file's name, size and
+(optionally) SHA-256, then sends the bytes in chunks, each starting at the
+offset the server has got to and optionally carrying its own SHA-256. A
+chunk is hashed while it streams into a part file under MEDIA_ROOT/uploads/,
+so nothing is held in memory, and a dropped connection costs at most the
+chunk in flight: the client asks for the offset and carries on from there.
+
+The whole-file hash is kept running per process and rebuilt from the part
+file when a chunk lands on another worker. Once the last byte arrives the
+file's type is checked from its content and it is renamed into
+content-addressed storage - on the same file system, so it is never copied -
+and attached to the application like a form upload would be.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from .images import check_passport_decodes, check_passport_header, schedule_passport_processing
+from .models import UploadedDocument, UploadSession
+from .storage import content_storage
+
+try:
+    import fcntl
+except ImportError:
+    # Without file locks, concurrent chunks are only serialised by the offset check
+    fcntl = None
+
+UPLOAD_DIR = 'uploads'
+READ_SIZE = 64 * 1024
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+# Accepted file name extensions, normalised
+EXTENSIONS = {'.jpg': '.jpg', '.jpeg': '.jpg', '.png': '.png', '.webp': '.webp', '.pdf': '.pdf'}
+ALLOWED_EXTENSIONS = {
+    'passport': {'.jpg', '.png', '.webp'},
+    'document': {'.pdf', '.jpg', '.png'},
+}
+# Enough of the file to recognise its type
+HEADER_BYTES = 12
+
+# Running whole-file hashes, {session id: (offset, sha256)}, least recently used first
+MAX_RUNNING_HASHES = 256
+_running_hashes = OrderedDict()
+_running_hashes_lock = threading.Lock()
+
+
+class UploadConflict(Exception):
+    """The chunk doesn't start where the upload has got to, or another request is writing it"""
+
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+def part_path(session):
+    return content_storage.path(f'{UPLOAD_DIR}/{session.pk}.part')
+
+
+def sniff_extension(header):
+    """The extension of the file type whose content starts with `header`, or None"""
+    if header.startswith(b'%PDF-'):
+        return '.pdf'
+    if header.startswith(b'\xff\xd8\xff'):
+        return '.jpg'
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return '.png'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return '.webp'
+    return None
+
+
+def describe(session):
+    """The upload's state as the client sees it"""
+    return {
+        'id': str(session.pk),
+        'offset': session.received,
+        'size': session.size,
+        'chunk_size': settings.UPLOAD_CHUNK_BYTES,
+        'complete': session.completed_at is not None,
+    }
+
+
+def start_upload(student, purpose, filename, size, document_type='', sha256=''):
+    """
+    Open an upload session, replacing the student's unfinished upload for
+    the same passport or document type. Raises ValidationError if the file
+    can't be accepted.
+    """
+    if purpose not in ALLOWED_EXTENSIONS:
+        raise ValidationError("Unknown upload purpose.")
+    if purpose == 'document':
+        if document_type not in dict(UploadedDocument.DOCUMENT_TYPES):
+            raise ValidationError("Choose the document type first.")
+    else:
+        document_type = ''
+
+    filename = os.path.basename(str(filename or '').replace('\\', '/')).strip()[:255]
+    extension = EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+    if extension not in ALLOWED_EXTENSIONS[purpose]:
+        allowed = ', '.join(sorted(ext.lstrip('.').upper() for ext in ALLOWED_EXTENSIONS[purpose]))
+        raise ValidationError(f"Upload the file as {allowed}.")
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise ValidationError("The file size is missing.")
+    if size <= 0:
+        raise ValidationError("The file is empty.")
+    if size > settings.UPLOAD_MAX_BYTES:
+        raise ValidationError(
+            f"The file is too large ({size / 1024 / 1024:.1f} MB); "
+            f"the limit is {settings.UPLOAD_MAX_BYTES / 1024 / 1024:.0f} MB."
+        )
+    sha256 = str(sha256 or '').lower()
+    if sha256 and not SHA256_RE.match(sha256):
+        raise ValidationError("The SHA-256 checksum must be 64 hexadecimal digits.")
+
+    for stale in UploadSession.objects.filter(
+        student=student, purpose=purpose, document_type=document_type, completed_at__isnull=True,
+    ):
+        discard(stale)
+
+    session = UploadSession.objects.create(
+        student=student, purpose=purpose, document_type=document_type,
+        filename=filename, size=size, sha256=sha256,
+    )
+    path = part_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'xb').close()
+    return session
+
+
+def discard(session):
+    """Delete an upload session and its part file"""
+    _forget_hash(session.pk)
+    try:
+        os.remove(part_path(session))
+    except FileNotFoundError:
+        pass
+    session.delete()
+
+
+@contextmanager
+def _locked_part(session):
+    """The part file, opened for writing and locked against other requests"""
+    try:
+        part = open(part_path(session), 'r+b')
+    except FileNotFoundError:
+        session.refresh_from_db(fields=['received', 'completed_at'])
+        if session.completed_at is not None:
+            raise UploadConflict("This upload is already complete.", session.received)
+        raise ValidationError("This upload has expired; start it again.")
+    with part:
+        if fcntl is not None:
+            try:
+                fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadConflict("Another chunk of this upload is being received.", session.received)
+        # The offset may have moved while this request waited for the lock
+        session.refresh_from_db(fields=['received', 'completed_at'])
+        yield part
+
+
+def receive_chunk(session, offset, stream, length, chunk_sha256=''):
+    """
+    Append `length` bytes read from `stream` at `offset`, which must be
+    where the upload has got to. With `chunk_sha256` the chunk is kept
+    only if it arrived whole and intact; without it, whatever arrived
+    before a dropped connection is kept. Returns the updated session.
+    """
+    if length > settings.UPLOAD_CHUNK_BYTES:
+        raise ValidationError(f"Chunks may be at most {settings.UPLOAD_CHUNK_BYTES} bytes.")
+    chunk_sha256 = str(chunk_sha256 or '').lower()
+    if chunk_sha256 and not SHA256_RE.match(chunk_sha256):
+        raise ValidationError("The chunk's SHA-256 checksum must be 64 hexadecimal digits.")
+
+    with _locked_part(session) as part:
+        if session.completed_at is not None:
+            raise UploadConflict("This upload is already complete.", session.received)
+        if offset != session.received:
+            raise UploadConflict(f"The upload continues at byte {session.received}.", session.received)
+        if offset + length > session.size:
+            raise ValidationError(f"The chunk runs past the announced size of {session.size} bytes.")
+
+        whole = _running_hash(session, part)
+        chunk = hashlib.sha256()
+        part.seek(offset)
+        # Drop whatever a failed write left past the offset
+        part.truncate()
+        written = 0
+        while written < length:
+            data = stream.read(min(READ_SIZE, length - written))
+            if not data:
+                break
+            part.write(data)
+            chunk.update(data)
+            whole.update(data)
+            written += len(data)
+
+        if chunk_sha256 and (written < length or chunk.hexdigest() != chunk_sha256):
+            part.truncate(offset)
+            if written == length:
+                raise ValidationError("The chunk did not arrive intact; send it again.")
+            return session
+        part.flush()
+
+        received = offset + written
+        if offset < HEADER_BYTES and received >= min(HEADER_BYTES, session.size):
+            part.seek(0)
+            if sniff_extension(part.read(HEADER_BYTES)) not in ALLOWED_EXTENSIONS[session.purpose]:
+                discard(session)
+                raise ValidationError("This type of file can't be uploaded here.")
+
+        UploadSession.objects.filter(pk=session.pk, received=offset).update(
+            received=received, updated_at=timezone.now()
+        )
+        session.received = received
+        _remember_hash(session.pk, received, whole)
+    return session
+
+
+def finish_upload(session, application):
+    """
+    Check the assembled file, move it into content-addressed storage and
+    attach it to `application`. Returns the stored name.
+    """
+    with _locked_part(session) as part:
+        if session.completed_at is not None:
+            return session.stored_name
+        if session.received != session.size:
+            raise UploadConflict(f"The upload continues at byte {session.received}.", session.received)
+
+        digest = _running_hash(session, part).hexdigest()
+        if session.sha256 and digest != session.sha256:
+            discard(session)
+            raise ValidationError("The file did not arrive intact; upload it again.")
+        part.seek(0)
+        extension = sniff_extension(part.read(HEADER_BYTES))
+        if session.purpose == 'passport':
+            part.seek(0)
+            try:
+                if session.size <= settings.PASSPORT_INLINE_MAX_BYTES:
+                    # Normalised during this request, so a truncated file must fail here
+                    check_passport_decodes(part)
+                else:
+                    # The process_passport job decodes it and takes it off the application if it is damaged
+                    check_passport_header(part)
+            except ValidationError:
+                discard(session)
+                raise
+
+        # The lock goes with the part file's name; the session row guards against a second finish
+        name = content_storage.adopt(part_path(session), digest, extension)
+        _forget_hash(session.pk)
+
+    try:
+        _attach(session, application, name)
+    except ValidationError:
+        # The photo failed processing and is off the application; the stored file is left for gc_media
+        discard(session)
+        raise
+    session.sha256 = digest
+    session.stored_name = name
+    session.completed_at = timezone.now()
+    session.save(update_fields=['sha256', 'stored_name', 'completed_at', 'updated_at'])
+    return name
+
+
+def _attach(session, application, name):
+    """Point the passport or document at the stored file; the model signals count the reference"""
+    if session.purpose == 'passport':
+        if application.passport_photo.name == name:
+            return
+        application.passport_photo = name
+        application.passport_thumbnail_small = ''
+        application.passport_thumbnail_medium = ''
+        application.save(update_fields=[
+            'passport_photo', 'passport_thumbnail_small', 'passport_thumbnail_medium', 'updated_at',
+        ])
+        schedule_passport_processing(application)
+    else:
+        document = application.documents.filter(document_type=session.document_type).first()
+        if document is None:
+            # Assigned after construction, as a form would, so the save counts it as new
+            document = UploadedDocument(application=application, document_type=session.document_type)
+            document.document = name
+            document.save()
+        elif document.document.name != name:
+            document.document = name
+            document.save(update_fields=['document'])
+
+
+def _running_hash(session, part):
+    """The SHA-256 of the part file's first `session.received` bytes, reusing this process's running hash"""
+    with _running_hashes_lock:
+        entry = _running_hashes.pop(session.pk, None)
+    if entry is not None and entry[0] == session.received:
+        return entry[1]
+    digest = hashlib.sha256()
+    part.seek(0)
+    remaining = session.received
+    while remaining:
+        data = part.read(min(READ_SIZE, remaining))
+        if not data:
+            raise ValidationError("This upload's data is missing; start it again.")
+        digest.update(data)
+        remaining -= len(data)
+    return digest
+
+
+def _remember_hash(session_id, offset, digest):
+    with _running_hashes_lock:
+        _running_hashes[session_id] = (offset, digest)
+        while len(_running_hashes) > MAX_RUNNING_HASHES:
+            _running_hashes.popitem(last=False)
+
+
+def _forget_hash(session_id):
+    with _running_hashes_lock:
+        _running_hashes.pop(session_id, None)
+
+
+def expire_uploads(before, dry_run=False):
+    """
+    Delete upload sessions untouched since `before`, with their part
+    files, and part files no session owns. Returns the number of files removed.
+    """
+    expired = UploadSession.objects.filter(updated_at__lt=before)
+    live = {f'{pk}.part' for pk in UploadSession.objects.filter(updated_at__gte=before).values_list('pk', flat=True)}
+    directory = content_storage.path(UPLOAD_DIR)
+    cutoff = before.timestamp()
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        entries = []
+    for entry in entries:
+        if entry.name in live or not entry.is_file(follow_symlinks=False):
+            continue
+        try:
+            if entry.stat().st_mtime > cutoff:
+                continue
+            if not dry_run:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            continue
+        removed += 1
+    if not dry_run:
+        for session_id in expired.values_list('pk', flat=True):
+            _forget_hash(session_id)
+        expired.delete()
+    return removed
@@ -9,9 +9,13 @@ urlpatterns = [
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('application/', views.application_form, name='application_form'),
+    path('application/sections/<slug:section>/', views.save_application_section, name='save_application_section'),
+    path('application/uploads/', views.start_chunked_upload, name='start_chunked_upload'),
+    path('application/uploads/<uuid:upload_id>/', views.chunked_upload, name='chunked_upload'),
     path('payment/initiate/', views.initiate_payment, name='initiate_payment'),
     path('payment/verify/', views.verify_payment, name='verify_payment'),
     path('payment/callback/', views.verify_payment, name='payment_callback'),
+    path('payment/webhook/', views.paystack_webhook, name='paystack_webhook'),
     path('application/pdf/', views.download_application_pdf, name='download_application_pdf'),
     path('about/', views.about, name='about'),
     path('contact/', views.contact, name='contact'),
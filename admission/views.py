@@ -2,26 +2,50 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, Http404, JsonResponse, HttpResponse
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from django.forms import formset_factory
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods, require_POST
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 import json
-import requests
 import uuid
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
-from reportlab.lib.units import inch
-import os
-from PIL import Image as PILImage
 from .models import *
 from .forms import *
+from .caching import cache_anonymous_page, cached_dashboard_state
+from .media import serve_media
+from .pdf import application_pdf_filename, application_pdf_fingerprint, cached_application_pdf
+from .payments import is_verifying, record_event, request_verification, settle_events, signature_is_valid
+from .sections import (
+    SECTIONS, DocumentFormSet, SSCEFormSet, SchoolFormSet, bind_section, completeness, save_sections, section_errors,
+)
+from .uploads import UploadConflict, describe, finish_upload, receive_chunk, start_upload
 
+# The full-page form's save buttons: the sections each one saves, and what it says
+PAGE_SECTIONS = {
+    'personal': ('personal', 'guardian'),
+    'schools': ('schools',),
+    'ssce': ('ssce',),
+    'courses': ('courses',),
+    'declaration': ('declaration',),
+    'documents': ('documents',),
+}
+SECTION_SAVED_MESSAGES = {
+    'personal': 'Personal information saved successfully!',
+    'schools': 'Schools information saved successfully!',
+    'ssce': 'SSCE results saved successfully!',
+    'courses': 'Course selection saved successfully!',
+    'declaration': 'Declaration saved successfully!',
+    'documents': 'Documents uploaded successfully!',
+}
+
+@cache_anonymous_page('admission/home.html')
 def home(request):
     """Homepage view"""
     context = {
@@ -34,36 +58,35 @@ def register(request):
     if request.method == 'POST':
         form = StudentRegistrationForm(request.POST)
         if form.is_valid():
-            user = form.save()
-            referral_code_str = form.cleaned_data.get('referral_code')
+            referral_code = form.cleaned_data.get('referral_code')
             
-            # Create student profile
-            student = Student.objects.create(
-                user=user,
-                phone=form.cleaned_data['phone']
-            )
+            # User, referral redemption and student profile succeed or fail together
+            with transaction.atomic():
+                user = form.save()
+                # Single conditional UPDATE: only one registrant can claim the code
+                claimed = referral_code and ReferralCode.objects.filter(
+                    pk=referral_code.pk, is_used=False
+                ).update(is_used=True, used_by=user, used_at=timezone.now())
+                
+                if referral_code and not claimed:
+                    transaction.set_rollback(True)
+                    form.add_error('referral_code', form.REFERRAL_CODE_ERROR)
+                else:
+                    Student.objects.create(
+                        user=user,
+                        phone=form.cleaned_data['phone'],
+                        referral_code=referral_code,
+                        can_apply=bool(referral_code)
+                    )
             
-            # Handle referral code
-            if referral_code_str:
-                try:
-                    referral_code = ReferralCode.objects.get(code=referral_code_str, is_used=False)
-                    referral_code.is_used = True
-                    referral_code.used_by = user
-                    referral_code.used_at = timezone.now()
-                    referral_code.save()
-                    
-                    student.referral_code = referral_code
-                    student.can_apply = True
-                    student.save()
-                    
+            if not form.errors:
+                if referral_code:
                     messages.success(request, 'Registration successful! You can now proceed to fill your application form.')
-                except ReferralCode.DoesNotExist:
-                    pass
-            else:
-                messages.success(request, 'Registration successful! Please make payment to access the application form.')
-            
-            login(request, user)
-            return redirect('dashboard')
+                else:
+                    messages.success(request, 'Registration successful! Please make payment to access the application form.')
+                
+                login(request, user)
+                return redirect('dashboard')
     else:
         form = StudentRegistrationForm()
     
@@ -72,23 +95,25 @@ def register(request):
 @login_required
 def dashboard(request):
     """Student dashboard"""
-    student = get_object_or_404(Student, user=request.user)
+    state = cached_dashboard_state(request.user, _dashboard_state)
     
     context = {
-        'student': student,
         'application_fee': settings.APPLICATION_FEE,
         'paystack_public_key': settings.PAYSTACK_PUBLIC_KEY,
+        **state,
     }
     
-    # Check if student has application
-    try:
-        application = Application.objects.get(student=student)
-        context['application'] = application
-    except Application.DoesNotExist:
-        pass
-    
     return render(request, 'admission/dashboard.html', context)
 
+def _dashboard_state(user):
+    """The student, application and verification flag the dashboard shows"""
+    student = get_object_or_404(Student.objects.select_related('referral_code'), user=user)
+    return {
+        'student': student,
+        'application': Application.objects.filter(student=student).first(),
+        'verifying': not student.can_apply and is_verifying(student),
+    }
+
 @login_required
 def initiate_payment(request):
     """Initiate Paystack payment"""
@@ -128,7 +153,7 @@ def initiate_payment(request):
 
 @login_required
 def verify_payment(request):
-    """Verify Paystack payment"""
+    """Record a Paystack callback and queue the payment for verification"""
     reference = request.GET.get('reference')
     
     if not reference:
@@ -136,68 +161,63 @@ def verify_payment(request):
         return redirect('dashboard')
     
     try:
-        payment = Payment.objects.get(reference=reference)
-        student = payment.student
-        
-        # Check if this payment belongs to the current user
-        if student.user != request.user:
-            messages.error(request, 'Invalid payment reference for this account')
-            return redirect('dashboard')
-        
-        # Verify payment with Paystack
-        headers = {
-            'Authorization': f'Bearer {settings.PAYSTACK_SECRET_KEY}',
-            'Content-Type': 'application/json',
-        }
-        
-        try:
-            response = requests.get(
-                f'https://api.paystack.co/transaction/verify/{reference}',
-                headers=headers,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data['status'] and data['data']['status'] == 'success':
-                    # Verify the amount matches
-                    paid_amount = data['data']['amount']  # Amount in kobo
-                    expected_amount = settings.APPLICATION_FEE_KOBO
-                    
-                    if paid_amount >= expected_amount:
-                        # Payment successful
-                        payment.status = 'success'
-                        payment.paystack_reference = data['data']['reference']
-                        payment.save()
-                        
-                        # Update student status
-                        student.has_paid = True
-                        student.can_apply = True
-                        student.save()
-                        
-                        messages.success(request, 'Payment successful! You can now fill your application form.')
-                    else:
-                        payment.status = 'failed'
-                        payment.save()
-                        messages.error(request, 'Payment amount verification failed.')
-                else:
-                    payment.status = 'failed'
-                    payment.save()
-                    messages.error(request, f'Payment failed: {data.get("message", "Unknown error")}')
-            else:
-                payment.status = 'failed'
-                payment.save()
-                messages.error(request, 'Payment verification failed. Please contact support.')
-        except requests.exceptions.RequestException as e:
-            messages.error(request, 'Network error during payment verification. Please try again.')
-        except Exception as e:
-            messages.error(request, 'An error occurred during payment verification. Please contact support.')
-    
+        payment = Payment.objects.select_related('student').get(reference=reference)
     except Payment.DoesNotExist:
         messages.error(request, 'Payment record not found.')
+        return redirect('dashboard')
+    
+    # Check if this payment belongs to the current user
+    if payment.student.user_id != request.user.id:
+        messages.error(request, 'Invalid payment reference for this account')
+        return redirect('dashboard')
+    
+    if payment.status == 'pending':
+        # Paystack is contacted by the `process_jobs` worker, not this request
+        request_verification(payment)
+        messages.info(request, 'Payment received! We are verifying it with Paystack. This page will update shortly.')
+    elif payment.status == 'success':
+        messages.success(request, 'Payment successful! You can now fill your application form.')
+    else:
+        messages.error(request, 'Payment verification failed. Please contact support.')
     
     return redirect('dashboard')
 
+@csrf_exempt
+@require_POST
+def paystack_webhook(request):
+    """Receive signed Paystack events and settle them from the inbox"""
+    if not signature_is_valid(request.body, request.headers.get('X-Paystack-Signature', '')):
+        return HttpResponse(status=401)
+    
+    try:
+        event = json.loads(request.body)
+    except ValueError:
+        return HttpResponse(status=400)
+    
+    if record_event(event):
+        settle_events()
+    
+    return HttpResponse(status=200)
+
+def _student_application(student):
+    """The student's application, created with what registration collected if there isn't one yet"""
+    try:
+        application = Application.objects.get(student=student)
+    except Application.DoesNotExist:
+        # Only now load the user for the defaults
+        application, created = Application.objects.get_or_create(
+            student=student,
+            defaults={
+                'first_name': student.user.first_name,
+                'surname': student.user.last_name,
+                'email': student.user.email,
+                'phone': student.phone,
+            }
+        )
+    # Saves reuse the loaded student to find whose dashboard to invalidate
+    application.student = student
+    return application
+
 @login_required
 def application_form(request):
     """Application form view"""
@@ -207,97 +227,24 @@ def application_form(request):
         messages.error(request, 'Please complete payment or use referral code to access application form.')
         return redirect('dashboard')
     
-    # Get or create application
-    application, created = Application.objects.get_or_create(
-        student=student,
-        defaults={
-            'first_name': student.user.first_name,
-            'surname': student.user.last_name,
-            'email': student.user.email,
-            'phone': student.phone,
-        }
-    )
-    
-    # Create formsets for related models
-    SchoolFormSet = formset_factory(SchoolAttendedForm, extra=3, max_num=3)
-    SSCEFormSet = formset_factory(SSCEResultForm, extra=2, max_num=2)
-    DocumentFormSet = formset_factory(DocumentUploadForm, extra=5, max_num=5)
+    application = _student_application(student)
     
     if request.method == 'POST':
         # Process different sections
         section = request.POST.get('section')
         
-        if section == 'personal':
-            personal_form = ApplicationPersonalInfoForm(request.POST, request.FILES, instance=application)
-            guardian_form = GuardianInfoForm(request.POST, instance=application)
-            
-            if personal_form.is_valid() and guardian_form.is_valid():
-                personal_form.save()
-                guardian_form.save()
-                messages.success(request, 'Personal information saved successfully!')
-                return redirect('application_form')
-        
-        elif section == 'schools':
-            school_formset = SchoolFormSet(request.POST, prefix='schools')
-            if school_formset.is_valid():
-                # Delete existing schools
-                SchoolAttended.objects.filter(application=application).delete()
-                # Save new schools
-                for form in school_formset:
-                    if form.cleaned_data and not form.cleaned_data.get('DELETE'):
-                        school = form.save(commit=False)
-                        school.application = application
-                        school.save()
-                messages.success(request, 'Schools information saved successfully!')
-                return redirect('application_form')
-        
-        elif section == 'ssce':
-            ssce_formset = SSCEFormSet(request.POST, prefix='ssce')
-            if ssce_formset.is_valid():
-                # Delete existing SSCE results
-                SSCEResult.objects.filter(application=application).delete()
-                # Save new SSCE results
-                for form in ssce_formset:
-                    if form.cleaned_data and not form.cleaned_data.get('DELETE'):
-                        ssce = form.save(commit=False)
-                        ssce.application = application
-                        ssce.save()
-                messages.success(request, 'SSCE results saved successfully!')
-                return redirect('application_form')
-        
-        elif section == 'courses':
-            course_form = CourseSelectionForm(request.POST, instance=application)
-            if course_form.is_valid():
-                course_form.save()
-                messages.success(request, 'Course selection saved successfully!')
-                return redirect('application_form')
-        
-        elif section == 'declaration':
-            declaration_form = DeclarationForm(request.POST, instance=application)
-            if declaration_form.is_valid():
-                declaration_form.save()
-                messages.success(request, 'Declaration saved successfully!')
-                return redirect('application_form')
-        
-        elif section == 'documents':
-            document_formset = DocumentFormSet(request.POST, request.FILES, prefix='documents')
-            if document_formset.is_valid():
-                for form in document_formset:
-                    if form.cleaned_data and not form.cleaned_data.get('DELETE'):
-                        document = form.save(commit=False)
-                        document.application = application
-                        # Check if document type already exists
-                        existing_doc = UploadedDocument.objects.filter(
-                            application=application,
-                            document_type=document.document_type
-                        ).first()
-                        if existing_doc:
-                            existing_doc.document = document.document
-                            existing_doc.save()
-                        else:
-                            document.save()
-                messages.success(request, 'Documents uploaded successfully!')
+        if section in PAGE_SECTIONS:
+            bound = {
+                name: bind_section(name, application, request.POST, request.FILES)
+                for name in PAGE_SECTIONS[section]
+            }
+            if all(form.is_valid() for form in bound.values()):
+                save_sections(application, bound)
+                messages.success(request, SECTION_SAVED_MESSAGES[section])
                 return redirect('application_form')
+            for form in bound.values():
+                for error in section_errors(form).get('__all__', []):
+                    messages.error(request, error)
         
         elif section == 'submit':
             # Final submission
@@ -317,14 +264,17 @@ def application_form(request):
     declaration_form = DeclarationForm(instance=application)
     
     # Initialize formsets with existing data
+    schools = list(application.schools_attended.all())
+    ssce_results = list(application.ssce_results.all())
+    existing_documents = list(application.documents.all())
     school_initial = [
         {'school_name': school.school_name, 'from_year': school.from_year, 'to_year': school.to_year}
-        for school in application.schools_attended.all()
+        for school in schools
     ]
     school_formset = SchoolFormSet(prefix='schools', initial=school_initial)
     
     ssce_initial = []
-    for result in application.ssce_results.all():
+    for result in ssce_results:
         ssce_initial.append({
             'sitting_number': result.sitting_number,
             'exam_type': result.exam_type,
@@ -351,6 +301,8 @@ def application_form(request):
     
     document_formset = DocumentFormSet(prefix='documents')
     
+    state = completeness(application, related=(schools, ssce_results, [doc.document_type for doc in existing_documents]))
+    
     context = {
         'application': application,
         'personal_form': personal_form,
@@ -360,14 +312,81 @@ def application_form(request):
         'course_form': course_form,
         'declaration_form': declaration_form,
         'document_formset': document_formset,
-        'existing_documents': application.documents.all(),
+        'existing_documents': existing_documents,
+        'completeness': state,
+        'progress': state['progress'],
     }
     
     return render(request, 'admission/application_form.html', context)
 
+@login_required
+@require_POST
+def save_application_section(request, section):
+    """Autosave one application form section; returns its field errors or the new completeness"""
+    if section not in SECTIONS:
+        raise Http404
+    student = get_object_or_404(Student, user=request.user)
+    if not student.can_apply:
+        return JsonResponse({'error': 'Please complete payment or use referral code to access application form.'}, status=403)
+    
+    application = _student_application(student)
+    form = bind_section(section, application, request.POST, request.FILES, autosave=True)
+    if not form.is_valid():
+        return JsonResponse({'saved': False, 'errors': section_errors(form)}, status=400)
+    save_sections(application, {section: form})
+    return JsonResponse({'saved': True, 'completeness': completeness(application)})
+
+@login_required
+@require_POST
+def start_chunked_upload(request):
+    """Open a resumable upload of a passport photograph or document; the bytes follow in chunks"""
+    student = get_object_or_404(Student, user=request.user)
+    if not student.can_apply:
+        return JsonResponse({'error': 'Please complete payment or use referral code to access application form.'}, status=403)
+    try:
+        data = json.loads(request.body)
+        session = start_upload(
+            student, data.get('purpose'), data.get('filename'), data.get('size'),
+            document_type=data.get('document_type', ''), sha256=data.get('sha256', ''),
+        )
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'Send the upload details as a JSON object.'}, status=400)
+    except ValidationError as exc:
+        return JsonResponse({'error': ' '.join(exc.messages)}, status=400)
+    state = describe(session)
+    state['url'] = reverse('chunked_upload', args=[session.pk])
+    return JsonResponse(state, status=201)
+
+@login_required
+@require_http_methods(['GET', 'HEAD', 'PATCH'])
+def chunked_upload(request, upload_id):
+    """Report how far an upload has got (GET), or append the chunk starting at its Upload-Offset (PATCH)"""
+    session = get_object_or_404(UploadSession.objects.select_related('student'), pk=upload_id, student__user=request.user)
+    if request.method != 'PATCH':
+        return JsonResponse(describe(session))
+    
+    try:
+        offset = int(request.headers['Upload-Offset'])
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'Send the chunk\'s starting byte in the Upload-Offset header.'}, status=400)
+    try:
+        receive_chunk(session, offset, request, length, request.headers.get('Upload-Chunk-SHA256', ''))
+        if session.received == session.size:
+            application = _student_application(session.student)
+            finish_upload(session, application)
+            state = describe(session)
+            state['completeness'] = completeness(application)
+            return JsonResponse(state)
+    except UploadConflict as exc:
+        return JsonResponse({'error': str(exc), **describe(session), 'offset': exc.offset}, status=409)
+    except ValidationError as exc:
+        return JsonResponse({'error': ' '.join(exc.messages), 'offset': session.received}, status=400)
+    return JsonResponse(describe(session))
+
 @login_required
 def download_application_pdf(request):
-    """Generate and download application form as PDF"""
+    """Serve the application form PDF, rendering it only when the application has changed"""
     student = get_object_or_404(Student, user=request.user)
     
     try:
@@ -376,128 +395,47 @@ def download_application_pdf(request):
         messages.error(request, 'Application not found.')
         return redirect('dashboard')
     
-    # Create PDF
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="CHSTH_Application_{application.application_number}.pdf"'
-    
-    doc = SimpleDocTemplate(response, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-    
-    # Header
-    header = Paragraph("COLLEGE OF HEALTH SCIENCES AND TECHNOLOGY HADEJIA", styles['Title'])
-    story.append(header)
-    story.append(Spacer(1, 12))
-    
-    subheader = Paragraph("ADMISSION APPLICATION FORM", styles['Heading1'])
-    story.append(subheader)
-    story.append(Spacer(1, 12))
-    
-    # Application Number
-    app_num = Paragraph(f"<b>Application Number:</b> {application.application_number}", styles['Normal'])
-    story.append(app_num)
-    story.append(Spacer(1, 12))
-    
-    # Personal Information
-    personal_data = [
-        ['<b>SECTION A: PERSONAL INFORMATION</b>', ''],
-        ['First Name:', application.first_name],
-        ['Surname:', application.surname],
-        ['Other Name:', application.other_name or 'N/A'],
-        ['Date of Birth:', str(application.date_of_birth)],
-        ['Phone:', application.phone],
-        ['Email:', application.email],
-        ['Address:', application.address],
-        ['LGA:', application.lga],
-        ['State of Origin:', application.state_of_origin],
-    ]
-    
-    personal_table = Table(personal_data, colWidths=[2.5*inch, 4*inch])
-    personal_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    story.append(personal_table)
-    story.append(Spacer(1, 12))
-    
-    # Guardian Information
-    guardian_data = [
-        ['<b>GUARDIAN/NEXT OF KIN INFORMATION</b>', ''],
-        ['Full Name:', application.guardian_name],
-        ['Phone:', application.guardian_phone],
-        ['Address:', application.guardian_address],
-        ['Relationship:', application.guardian_relationship],
-    ]
-    
-    guardian_table = Table(guardian_data, colWidths=[2.5*inch, 4*inch])
-    guardian_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    story.append(guardian_table)
-    story.append(Spacer(1, 12))
-    
-    # Course Selection
-    course_data = [
-        ['<b>SECTION D: COURSE SELECTION</b>', ''],
-        ['First Choice:', application.get_first_choice_display()],
-        ['Second Choice:', application.get_second_choice_display()],
-    ]
-    
-    course_table = Table(course_data, colWidths=[2.5*inch, 4*inch])
-    course_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    story.append(course_table)
-    story.append(Spacer(1, 12))
-    
-    # Declaration
-    if application.declaration_text:
-        declaration_header = Paragraph("<b>SECTION E: DECLARATION</b>", styles['Heading2'])
-        story.append(declaration_header)
-        story.append(Spacer(1, 6))
-        
-        declaration_text = Paragraph(application.declaration_text, styles['Normal'])
-        story.append(declaration_text)
-        story.append(Spacer(1, 12))
-    
-    # Footer
-    footer = Paragraph("This is a computer-generated document.", styles['Normal'])
-    story.append(footer)
-    
-    doc.build(story)
+    fingerprint = application_pdf_fingerprint(application)
+    etag = f'"{fingerprint}"'
+    last_modified = int(application.updated_at.timestamp())
+    
+    # Browser already holds this version: answer 304 without touching the PDF
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+    
+    name = cached_application_pdf(application, fingerprint)
+    response = FileResponse(default_storage.open(name, 'rb'), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{application_pdf_filename(application)}"'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Private to the student, and always revalidated so edits show up at once
+    response['Cache-Control'] = 'private, no-cache'
     return response
 
+@login_required
+def protected_media(request, name):
+    """Serve an uploaded file to staff or to the student whose application references it"""
+    if not request.user.is_staff:
+        owns_file = Application.objects.filter(student__user=request.user).filter(
+            Q(passport_photo=name) | Q(passport_thumbnail_small=name) | Q(passport_thumbnail_medium=name)
+            | Q(documents__document=name)
+        ).exists()
+        if not owns_file:
+            raise Http404
+    return serve_media(request, name)
+
+@cache_anonymous_page('admission/about.html')
 def about(request):
     """About page"""
     return render(request, 'admission/about.html')
 
+@cache_anonymous_page('admission/contact.html')
 def contact(request):
     """Contact page"""
     return render(request, 'admission/contact.html')
 
+@cache_anonymous_page('admission/courses.html')
 def courses(request):
     """Courses page"""
     return render(request, 'admission/courses.html')
\ No newline at end of file
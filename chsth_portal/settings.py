@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 from decouple import config
 
@@ -16,6 +17,8 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    # Serve static files through WhiteNoise under runserver too
+    'whitenoise.runserver_nostatic',
     'django.contrib.staticfiles',
     'crispy_forms',
     'crispy_bootstrap5',
@@ -24,6 +27,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -45,6 +49,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'admission.context_processors.fragment_cache',
             ],
         },
     },
@@ -52,13 +57,36 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'chsth_portal.wsgi.application'
 
+# SQLite profile: 'production' runs in WAL mode with the pragmas below and
+# opens every transaction with BEGIN IMMEDIATE, so concurrent writers queue
+# instead of failing with "database is locked"; 'plain' is stock SQLite.
+# WAL mode is a property of the database file, so development (DEBUG)
+# defaults to 'plain' and leaves the checked-in db.sqlite3 as it is. The test
+# database is a throwaway file, so tests get 'production', whose locking the
+# concurrency tests rely on
+TESTING = sys.argv[1:2] == ['test']
+SQLITE_PROFILE = config('SQLITE_PROFILE', default='plain' if DEBUG and not TESTING else 'production')
+SQLITE_PATH = config('SQLITE_PATH', default=str(BASE_DIR / 'db.sqlite3'))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': 'chsth_portal.sqlite3' if SQLITE_PROFILE == 'production' else 'django.db.backends.sqlite3',
+        'NAME': SQLITE_PATH,
+        # On disk rather than in memory: the concurrency tests' threads must queue for locks as in production
+        'TEST': {'NAME': config('SQLITE_TEST_PATH', default=str(BASE_DIR / 'test_db.sqlite3'))},
     }
 }
 
+# Applied to every new SQLite connection by admission.signals
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,  # milliseconds
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,  # negative: KiB, so 64 MB per connection
+    'temp_store': 'MEMORY',
+} if SQLITE_PROFILE == 'production' else {}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -84,9 +112,70 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
+# collectstatic fingerprints every file and writes gzip and (with the Brotli
+# package) .br copies next to it; WhiteNoise serves fingerprinted files with
+# far-future immutable Cache-Control and picks the smallest encoding the
+# client accepts. Vendored assets come from `manage.py build_assets`.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+WHITENOISE_KEEP_ONLY_HASHED_FILES = True
+# Pages link only the self-hosted assets, so without build_assets' output
+# `check` and `collectstatic` fail (a warning in development)
+REQUIRE_BUILT_ASSETS = config('REQUIRE_BUILT_ASSETS', default=not DEBUG, cast=bool)
+
+# Cache: 'locmem' (per process), 'file' (shared by processes on one host)
+# or 'redis' (any Redis-protocol server, e.g. redis://127.0.0.1:6379/0;
+# needs the redis package)
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+CACHE_LOCATION = config('CACHE_LOCATION', default='')
+CACHES = {
+    'default': {
+        'locmem': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': CACHE_LOCATION or 'chsth',
+        },
+        'file': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_LOCATION or str(BASE_DIR / 'cache'),
+        },
+        'redis': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_LOCATION or 'redis://127.0.0.1:6379/0',
+        },
+    }[CACHE_BACKEND] | {'KEY_PREFIX': 'chsth'},
+}
+# Only a cache every process shares sees invalidations made by other
+# workers or by process_jobs. With locmem, dashboards aren't cached and
+# sessions are read from the database, so a logout reaches every worker.
+SHARED_CACHE = CACHE_BACKEND != 'locmem'
+# Seconds anonymous public pages and the shared navbar/footer stay cached
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=600, cast=int)
+FRAGMENT_CACHE_TIMEOUT = config('FRAGMENT_CACHE_TIMEOUT', default=3600, cast=int)
+# Cached dashboard state is invalidated on change; this only bounds staleness
+# after writes that bypass the invalidation
+DASHBOARD_CACHE_TIMEOUT = config('DASHBOARD_CACHE_TIMEOUT', default=300, cast=int)
+# With a shared cache, sessions are read through it, so most requests skip the session query
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + ('cached_db' if SHARED_CACHE else 'db')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Let the front-end server send media after Django checks access:
+# 'nginx' (X-Accel-Redirect to an internal location aliasing MEDIA_ROOT at
+# MEDIA_ACCEL_PREFIX), 'apache' (X-Sendfile), or '' to stream from Django
+MEDIA_SENDFILE = config('MEDIA_SENDFILE', default='')
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+
+# Passport photographs: uploads above this many pixels are rejected before
+# decoding, and uploads above this size are normalised by the job worker
+PASSPORT_MAX_PIXELS = 40_000_000
+PASSPORT_INLINE_MAX_BYTES = 1024 * 1024
+
+# Chunked uploads (admission.uploads): the largest file accepted, and the
+# largest chunk, which bounds what one flaky mobile request has to resend
+UPLOAD_MAX_BYTES = config('UPLOAD_MAX_BYTES', default=10 * 1024 * 1024, cast=int)
+UPLOAD_CHUNK_BYTES = config('UPLOAD_CHUNK_BYTES', default=512 * 1024, cast=int)
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -102,6 +191,11 @@ LOGOUT_REDIRECT_URL = '/'
 # Paystack Configuration
 PAYSTACK_PUBLIC_KEY = config('PAYSTACK_PUBLIC_KEY', default='')
 PAYSTACK_SECRET_KEY = config('PAYSTACK_SECRET_KEY', default='')
+# Point at a local stub when testing payment verification
+PAYSTACK_API_URL = config('PAYSTACK_API_URL', default='https://api.paystack.co')
+PAYSTACK_TIMEOUT = config('PAYSTACK_TIMEOUT', default=30, cast=int)
+# Seconds to wait for the webhook before the worker verifies a payment itself
+PAYSTACK_VERIFY_DELAY = config('PAYSTACK_VERIFY_DELAY', default=30, cast=int)
 
 # Application Fee
 APPLICATION_FEE = 7500  # in Naira (kobo for Paystack)
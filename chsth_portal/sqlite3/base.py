@@ -0,0 +1,16 @@
+"""
+SQLite backend whose transactions take the write lock up front.
+
+Django opens transactions with a plain (deferred) BEGIN. When two of
+them read and then try to write, SQLite cannot wait for the lock upgrade
+and one fails at once with "database is locked", whatever busy_timeout
+says. BEGIN IMMEDIATE takes the write lock when the transaction starts,
+so concurrent writers queue on busy_timeout instead. Readers outside a
+transaction are not blocked under WAL.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -1,12 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from admission import views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # Uploads are private: every media URL goes through the access check
+    path(f"{settings.MEDIA_URL.lstrip('/')}<path:name>", views.protected_media, name='protected_media'),
     path('', include('admission.urls')),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file